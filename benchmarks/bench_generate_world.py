@@ -0,0 +1,84 @@
+import copy
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame
+
+from models.world import World, getPossibleChunks
+
+HARD = 2
+
+
+#the world generation as it was before placed chunks, every slot is a deep copy of its template
+def deepcopy_generate(world, time_limit):
+    num_chunks = int((time_limit * 60) / 8)
+    chunks = world.file_chunks
+    normal_qty = [idx for idx in range(len(chunks[0]))]
+    tunnel_qty = [idx for idx in range(len(chunks[1]))]
+    world_chunks = [copy.deepcopy(world.start_end_chunk)]
+    for pos in range(1, num_chunks - 1):
+        if (world_chunks[pos - 1].tunnel and random.randint(0, 10)):
+            random.shuffle(tunnel_qty)
+            next_chunk = getPossibleChunks(chunks[1], world_chunks[pos - 1], tunnel_qty)
+            if (next_chunk):
+                world_chunks.append(copy.deepcopy(next_chunk))
+                continue
+        random.shuffle(normal_qty)
+        next_chunk = getPossibleChunks(chunks[0], world_chunks[pos - 1], normal_qty)
+        world_chunks.append(copy.deepcopy(next_chunk))
+    world_chunks.append(copy.deepcopy(world.start_end_chunk))
+    return world_chunks
+
+
+def placed_generate(world, time_limit):
+    world.generateWorld(HARD, time_limit)
+    return world.world_chunks
+
+
+#runs a generation function "repeat" times and returns the median time in ms and the memory kept by one world
+def measure(generate, world, time_limit, repeat):
+    times = []
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        generate(world, time_limit)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+
+    random.seed(0)
+    tracemalloc.start()
+    kept = generate(world, time_limit)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return times[len(times) // 2], memory
+
+
+#generates a Hard world (and longer ones) with deep copies (before) and placed chunks (after)
+def main(repeat=20):
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    pygame.font.init()
+    world = World(32, 20, 32)
+    # decode every template once so both methods start from the same state
+    for chunk in world.file_chunks[0] + world.file_chunks[1]:
+        chunk.blocks
+
+    print(f"{'time limit':>10} {'chunks':>7} {'before ms':>10} {'after ms':>9} {'before KiB':>11} {'after KiB':>10}")
+    for time_limit in (HARD + 1, 30, 300):
+        before_ms, before_mem = measure(deepcopy_generate, world, time_limit, repeat)
+        after_ms, after_mem = measure(placed_generate, world, time_limit, repeat)
+        print(f"{time_limit:>10} {int(time_limit * 60 / 8):>7} {before_ms:>10.3f} {after_ms:>9.3f} "
+              f"{before_mem / 1024:>11.1f} {after_mem / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime
+from os import listdir
+from os.path import isfile, join
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pygame
+
+from models.block import Chunk, PlacedChunk
+from models.chunk_pack import CHUNK_DIRS
+from models.game import Game
+from models.wave import RingCache, Wave, Waves
+from sprites.chunk_sprites import BlockSprite
+from sprites.monster_sprites import MonsterPoolSprite
+
+WIDTH = 1024
+HEIGHT = 640
+SCALE = 32
+
+
+#a benchmark case
+#setup(game) is called before every sample (not timed) and returns the argument of run
+#run(state) is timed "number" times in a row and the sample is the mean time of one run
+class Case:
+    def __init__(self, name, run, setup=None, number=1, repeat=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+
+    #returns the time of each sample in microseconds
+    def measure(self, game, repeat):
+        samples = []
+        for _ in range(self.repeat or repeat):
+            state = self.setup(game) if self.setup else game
+            run = self.run
+            start = time.perf_counter()
+            for _ in range(self.number):
+                run(state)
+            samples.append((time.perf_counter() - start) * 1e6 / self.number)
+        return samples
+
+
+#nearest rank percentile of sorted samples
+def percentile(samples, p):
+    return samples[max(math.ceil(p / 100 * len(samples)) - 1, 0)]
+
+
+# World.generateWorld at each difficulty (the same time limit as the menu gives it)
+def generate_world_case(difficulty):
+    def run(game):
+        game.world.generateWorld(difficulty, difficulty + 1, seed=random.randrange(1 << 32))
+    return Case(f"generate_world[difficulty={difficulty}]", run, repeat=50)
+
+
+# Chunk.load_chunk over every json file of the chunk directories
+def load_chunks(game):
+    for file_path in CHUNK_DIRS.values():
+        for f in listdir(file_path):
+            if isfile(join(file_path, f)):
+                Chunk.load_chunk(0, join(file_path, f))
+
+
+# BlockSprite of a random template, cold bakes the chunk image and cached takes it from the bake cache
+# (the cached case bakes its template before the timing so every timed run is a hit)
+def block_sprite_setup(cold):
+    def setup(game):
+        if cold:
+            BlockSprite.BAKE_CACHE.clear()
+        chunks = game.world.file_chunks
+        chunk = PlacedChunk(random.choice(chunks[0] + chunks[1]), random.randrange(100) * 16 * SCALE)
+        if not cold:
+            block_sprite(chunk)
+        return chunk
+    return setup
+
+
+def block_sprite(chunk):
+    BlockSprite(chunk, WIDTH // SCALE, HEIGHT // SCALE, SCALE)
+
+
+# moves the camera over a whole chunk (one pixel per tick) and loads the next one, on a 300 minute level
+def long_world_setup(game):
+    world = game.world
+    if not getattr(game, "long_world", False) or world.current_chunk >= len(world.world_chunks) - 4:
+        world.generateWorld(2, 300, seed=0)
+        world.startWorld()
+        game.long_world = True
+    return world
+
+
+def move_world(world):
+    for _ in range(16 * SCALE):
+        world.moveWorld(1)
+        world.moveCamera(1)
+    world.loadNextChunk()
+
+
+# the player collisions on the first chunk of a game
+def player_setup(game):
+    game.reset(0, 0)
+    game.long_world = False
+    return game.player_sprite
+
+
+def step_on_block(player_sprite):
+    player_sprite.step_on_block()
+
+
+def collision_with_wall(player_sprite):
+    player_sprite.collision_with_wall()
+
+
+# a pool of n waves all over the screen that never leave it
+def waves_setup(n):
+    def setup(game):
+        rng = random.Random(n)
+        waves = Waves()
+        for _ in range(n):
+            waves.add_wave(Wave([rng.randint(0, WIDTH), rng.randint(0, HEIGHT)], rng.randint(1, 10), 144,
+                                [0, rng.uniform(0.1, 0.4)]))
+        waves.radius[:waves.size] = rng.randint(0, 200)
+        return waves
+    return setup
+
+
+def waves_update(waves):
+    waves.shift(1)
+    waves.expire(WIDTH, HEIGHT)
+    waves.update()
+    waves.radius[:waves.size] -= waves.velocity[:waves.size]
+
+
+def waves_draw_setup(n):
+    make_waves = waves_setup(n)
+
+    def setup(game):
+        return make_waves(game), game.mask
+    return setup
+
+
+def waves_draw(state):
+    waves, mask = state
+    mask.fill(0)
+    waves.draw(mask)
+
+
+# one ring of a radius at the center of the mask, blitted from the RingCache (cached) or drawn (drawn)
+# the thickness is the one of a wave with a sound of 0.25 s, the RingCache max_radius comes from these cases
+RING_THICC = 27
+
+
+def ring_setup(radius, cached):
+    def setup(game):
+        ring = Wave.RING_CACHE.get(radius, RING_THICC) if cached else None
+        if cached and ring is None:
+            ring = RingCache(max_radius=radius).get(radius, RING_THICC)
+        return ring, radius, game.mask
+    return setup
+
+
+def ring_draw(state):
+    ring, radius, mask = state
+    x, y = WIDTH // 2, HEIGHT // 2
+    if ring:
+        mask.blit(ring, (x - radius / 2, y - radius / 2))
+    else:
+        pygame.draw.rect(mask, (0, 0, 255), pygame.Rect(x - radius / 2, y - radius / 2, radius, radius),
+                         RING_THICC, radius)
+
+
+# n spiders just spawned on a new game
+def monsters_setup(n):
+    def setup(game):
+        game.reset(0, 0)
+        game.long_world = False
+        random.seed(n)
+        for _ in range(n):
+            game.add_monster(game.spider_sprite, game.spider)
+        game.spider_sprite.animate()
+        return game.spider_sprite
+    return setup
+
+
+def monsters_update(monster_sprite):
+    monster_sprite.update()
+
+
+def monsters_draw_setup(n):
+    make_monsters = monsters_setup(n)
+
+    def setup(game):
+        return make_monsters(game), game.mask
+    return setup
+
+
+def monsters_draw(state):
+    monster_sprite, mask = state
+    monster_sprite.animate()
+    monster_sprite.draw(mask)
+
+
+# n spiders of the stress mode just spawned in a MonsterPool on a new game
+def monster_pool_setup(n):
+    def setup(game):
+        game.reset(0, 0)
+        game.long_world = False
+        random.seed(n)
+        monster_sprite = MonsterPoolSprite(game.spider, game.spider_sprite)
+        monster_sprite.spawn(n)
+        monster_sprite.animate()
+        return monster_sprite
+    return setup
+
+
+def monster_pool_draw_setup(n):
+    make_monsters = monster_pool_setup(n)
+
+    def setup(game):
+        return make_monsters(game), game.mask
+    return setup
+
+
+def make_cases():
+    cases = [generate_world_case(difficulty) for difficulty in range(3)]
+    cases += [
+        Case("load_chunk[all files]", load_chunks, repeat=20),
+        Case("block_sprite[cold]", block_sprite, block_sprite_setup(True)),
+        Case("block_sprite[cached]", block_sprite, block_sprite_setup(False), number=10),
+        Case("move_world[one chunk]", move_world, long_world_setup, repeat=50),
+        Case("player_step_on_block", step_on_block, player_setup, number=100, repeat=20),
+        Case("player_collision_with_wall", collision_with_wall, player_setup, number=100, repeat=20),
+    ]
+    for n in (10, 100, 1000):
+        cases.append(Case(f"waves_update[{n}]", waves_update, waves_setup(n), number=20))
+        cases.append(Case(f"waves_draw[{n}]", waves_draw, waves_draw_setup(n), number=5))
+    for radius in (32, 128, 256, 512, 768, 1024, 2048):
+        cases.append(Case(f"ring[cached,{radius}]", ring_draw, ring_setup(radius, True), number=20))
+        cases.append(Case(f"ring[drawn,{radius}]", ring_draw, ring_setup(radius, False), number=20))
+    for n in (1, 10, 50):
+        cases.append(Case(f"monster_update[{n}]", monsters_update, monsters_setup(n), number=20, repeat=20))
+        cases.append(Case(f"monster_draw[{n}]", monsters_draw, monsters_draw_setup(n), number=20, repeat=20))
+    for n in (50, 1000):
+        cases.append(Case(f"monster_pool_update[{n}]", monsters_update, monster_pool_setup(n), number=20, repeat=20))
+        cases.append(Case(f"monster_pool_draw[{n}]", monsters_draw, monster_pool_draw_setup(n), number=20,
+                          repeat=20))
+    return cases
+
+
+#compares the medians with a baseline run, returns the names of the cases slower than the threshold
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results["cases"].items():
+        base = baseline["cases"].get(name)
+        if not base:
+            continue
+        change = result["median_us"] / base["median_us"] - 1
+        result["change"] = change
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wave-Born hot path benchmarks")
+    parser.add_argument("-k", "--filter", default="", help="only run the cases with this text in the name")
+    parser.add_argument("-r", "--repeat", type=int, default=100, help="samples per case")
+    parser.add_argument("-o", "--output", help="write the results to this json file")
+    parser.add_argument("-b", "--baseline", help="json results of an earlier run to compare with")
+    parser.add_argument("-t", "--threshold", type=float, default=0.10,
+                        help="slowdown of the median over the baseline that counts as a regression (0.10 is 10%%)")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    random.seed(0)
+    game = Game(WIDTH, HEIGHT, SCALE)
+    game.reset(0, 0)
+
+    results = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "cases": {},
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'case':<32} {'median us':>11} {'p99 us':>11} {'baseline':>11} {'change':>8}")
+    for case in make_cases():
+        if args.filter not in case.name:
+            continue
+        samples = sorted(case.measure(game, args.repeat))
+        result = {"median_us": percentile(samples, 50), "p99_us": percentile(samples, 99),
+                  "samples": len(samples), "number": case.number}
+        results["cases"][case.name] = result
+
+        line = f"{case.name:<32} {result['median_us']:>11.1f} {result['p99_us']:>11.1f}"
+        base = baseline["cases"].get(case.name) if baseline else None
+        if base:
+            line += f" {base['median_us']:>11.1f} {result['median_us'] / base['median_us'] - 1:>+8.1%}"
+        print(line)
+
+    regressions = []
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        results["baseline"] = args.baseline
+        results["regressions"] = regressions
+
+    if args.output:
+        with open(args.output, "w") as outfile:
+            json.dump(results, outfile, indent=2)
+
+    pygame.quit()
+    if regressions:
+        print(f"{len(regressions)} cases are more than {args.threshold:.0%} slower than the baseline: "
+              + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import struct
+import sys
+import wave
+from os.path import basename, exists, isdir, join
+
+from pygame import mixer
+
+#the audio cache keeps the sounds decoded on disk as raw samples in the format the mixer plays
+#so loading a sound is reading its samples instead of decoding the mp3
+#the files are named after the source file and a hash of its content and of the mixer format (frequency, format, channels)
+#so a changed mp3 or a mixer opened with another format never uses old samples
+#layout of a sound (little endian):
+# header - magic, version, frequency, format, channels
+# samples - the samples as mixer.Sound.get_raw returns them
+#the music is streamed by pygame.mixer.music so it is kept as a wav file instead (when the mixer uses 16 bit samples)
+SOUND_MAGIC = b"WBSN"
+SOUND_VERSION = 1
+HEADER = struct.Struct("<4sHihH")
+AUDIO_CACHE_DIR = os.environ.get("WAVEBORN_AUDIO_CACHE", "./sources/baked")
+SOUNDS_DIR = "./sources/sounds"
+
+
+class AudioCache:
+    def __init__(self, directory=AUDIO_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.writes = 0
+
+    #the file of a source with this extension, None if the source or the mixer doesn't exist
+    def file_path(self, source, extension):
+        init = mixer.get_init()
+        if not init or not exists(source):
+            return None
+        with open(source, "rb") as f:
+            digest = hashlib.sha1(f.read())
+        digest.update(repr(init).encode())
+        return join(self.directory, f"{basename(source)}_{digest.hexdigest()[:20]}.{extension}")
+
+    #loads the sound of a file, None if it isn't cached
+    def load(self, source):
+        file_path = self.file_path(source, "pcm")
+        if file_path is None or not exists(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            data = f.read()
+        magic, version, *init = HEADER.unpack_from(data, 0)
+        if magic != SOUND_MAGIC or version != SOUND_VERSION or tuple(init) != mixer.get_init():
+            return None
+        self.hits += 1
+        return mixer.Sound(buffer=data[HEADER.size:])
+
+    #writes the samples of a sound decoded from a file
+    def save(self, source, sound):
+        file_path = self.file_path(source, "pcm")
+        if file_path is None:
+            return None
+        self._write(file_path, HEADER.pack(SOUND_MAGIC, SOUND_VERSION, *mixer.get_init()) + sound.get_raw())
+        return file_path
+
+    #the file to stream a music from: a wav file of it made the first time, or the source if the mixer isn't 16 bit
+    #None if the source doesn't exist
+    def music(self, source):
+        if not exists(source):
+            return None
+        file_path = self.file_path(source, "wav")
+        frequency, size, channels = mixer.get_init()
+        if file_path is None or abs(size) != 16:
+            return source
+        if not exists(file_path):
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            os.makedirs(self.directory, exist_ok=True)
+            with wave.open(tmp_path, "wb") as outfile:
+                outfile.setnchannels(channels)
+                outfile.setsampwidth(2)
+                outfile.setframerate(frequency)
+                outfile.writeframes(mixer.Sound(source).get_raw())
+            os.replace(tmp_path, file_path)
+            self.writes += 1
+        else:
+            self.hits += 1
+        return file_path
+
+    #writes to a temporary file first so a half written file is never read
+    def _write(self, file_path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as outfile:
+            outfile.write(data)
+        os.replace(tmp_path, file_path)
+        self.writes += 1
+
+    #removes every cached sound
+    def clear(self):
+        if not isdir(self.directory):
+            return
+        for f in os.listdir(self.directory):
+            if f.endswith(".pcm") or f.endswith(".wav") or f.endswith(".tmp"):
+                os.remove(join(self.directory, f))
+
+    #decodes every sound of the sounds directory, and the music
+    @staticmethod
+    def bake(music=(), sounds_dir=SOUNDS_DIR, directory=AUDIO_CACHE_DIR):
+        cache = AudioCache(directory)
+        cache.clear()
+        for f in sorted(os.listdir(sounds_dir)):
+            source = join(sounds_dir, f)
+            if f not in music and f.endswith(".mp3"):
+                cache.save(source, mixer.Sound(source))
+        for f in music:
+            cache.music(join(sounds_dir, f))
+        return cache
+
+
+#bake step: python -m models.audio_cache [frequency]
+#the music files are the ones main.py streams
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    mixer.init(*[int(arg) for arg in sys.argv[1:2]])
+    baked = AudioCache.bake(music=("breeze_bay.mp3",))
+    print(f"{baked.writes} sounds baked to {baked.directory} for the mixer format {mixer.get_init()}")
+    mixer.quit()
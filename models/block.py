@@ -1,7 +1,10 @@
 import json
+import threading
 
 from sprites.chunk_sprites import EndSprite
 
+_DECODE_LOCK = threading.Lock()  # decodes the lazy blocks of the chunks (see Chunk.blocks)
+
 #block class that represents a single block in the chunk
 class Block:
     def __init__(self, pos, block_type):
@@ -15,20 +18,39 @@ class Block:
 
 #class chunk that represents a chunk of the world it has
 #xpos int- its starting position in the x axis
-#blocks [blocks]- all the blocks in this chunk
+#blocks [blocks]- all the blocks in this chunk (or a callable that loads them the first time they are used)
 #pre_Requisits [[int],[int]]- the requisits to enter the chunks
 #post_requisits [[int],[int]]- the requisits to exis this chunk
 #tunnel boolean- if it is the tunnel or not
 class Chunk:
     def __init__(self, xpos, blocks, pre_requisits, post_requisits, tunnel=False, end=False):
         self.x = xpos
-        self.blocks = blocks
-        for block in self.blocks:
-            block.x += self.x
+        self._blocks = None
+        self._load_blocks = None
+        if callable(blocks):
+            self._load_blocks = blocks
+        else:
+            self._blocks = blocks
+            for block in self._blocks:
+                block.x += self.x
 
         self.tunnel = tunnel
         self.pre_requisits = pre_requisits
         self.post_requisits = post_requisits
+    #the blocks of the chunk, if they come from a chunk pack they are only decoded here
+    #the chunk prefetch threads read them too so they are decoded once under a lock
+    #and only stored when the whole list is ready
+    @property
+    def blocks(self):
+        if self._blocks is None:
+            with _DECODE_LOCK:
+                if self._blocks is None:
+                    blocks = self._load_blocks()
+                    for block in blocks:
+                        block.x += self.x
+                    self._blocks = blocks
+        return self._blocks
+
     #if this is the final chunk this method will create the end sprite for this chunk
     def end_chunk(self, SCALE=32):
         self.end_sprite = EndSprite(SCALE)
@@ -73,8 +95,9 @@ class Chunk:
             outfile.write(json_object)     
     #will udpate a chunk by moving it x_movement in pixels
     def update(self, x_movement):
+        blocks = self.blocks
         self.x -= x_movement
-        for block in self.blocks:
+        for block in blocks:
             block.x -= x_movement
     #will check if this chunk can be generated based on post_requists of another chunk
     def can_be_generated(self, post_requisits):
@@ -85,3 +108,42 @@ class Chunk:
                 if available[0] < top_requisit and available[1] > low_requisit:
                     return True
         return False
+
+#class that represents a chunk placed in the world
+#all placed chunks of the same kind share the same template chunk (its blocks are never copied)
+#and only keep what is different between them, the position and the end sprite
+#template Chunk- the read only chunk with the blocks and requisits
+#xpos int- its starting position in the x axis in world coordinates
+class PlacedChunk:
+    def __init__(self, template, xpos=0):
+        self.template = template
+        self.x = xpos
+        self.end_sprite = None
+
+    #the blocks of the template, their x is relative to the start of the chunk
+    @property
+    def blocks(self):
+        return self.template.blocks
+
+    @property
+    def tunnel(self):
+        return self.template.tunnel
+
+    @property
+    def pre_requisits(self):
+        return self.template.pre_requisits
+
+    @property
+    def post_requisits(self):
+        return self.template.post_requisits
+
+    #if this is the final chunk this method will create the end sprite for this chunk
+    def end_chunk(self, SCALE=32):
+        self.end_sprite = EndSprite(SCALE)
+
+    #will udpate a chunk by moving it x_movement in pixels
+    def update(self, x_movement):
+        self.x -= x_movement
+
+    def can_be_generated(self, post_requisits):
+        return self.template.can_be_generated(post_requisits)
@@ -0,0 +1,214 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from os import listdir
+from os.path import isfile, isdir, join, getmtime, exists
+
+from models.block import Block, Chunk
+
+#the chunk pack is a single binary file with every chunk template of the game
+#so the world doesn't have to parse one json file per chunk when it starts
+#layout (little endian):
+# header - magic, version, number of templates
+# template table - one fixed size entry per template (group, name, tunnel, requisits and tiles location)
+# requisits - int16 pairs (low, top) of every pre_requisit and post_requisit interval
+# tiles - int16 triples (x, y, block_type) of every block of every template
+PACK_MAGIC = b"WBCP"
+PACK_VERSION = 1
+HEADER = struct.Struct("<4sHH")
+GROUP_SIZE = 16  # bytes of the group name in a template entry
+NAME_SIZE = 32  # bytes of the file name in a template entry
+ENTRY = struct.Struct(f"<{GROUP_SIZE}s{NAME_SIZE}sBBBxIIH2x")
+REQUISIT = struct.Struct("<hh")
+TILE = struct.Struct("<hhh")
+
+CHUNK_PACK_PATH = "./chunks/chunks.pack"
+CHUNK_DIRS = {"normal": "./chunks/normal", "tunnel": "./chunks/tunnel"}
+
+
+#lazy block list of a template stored in the pack
+#it is shared between every copy of the chunk because the pack is read only
+class PackedBlocks:
+    def __init__(self, pack, index):
+        self.pack = pack
+        self.index = index
+
+    def __call__(self):
+        return [Block((x, y), block_type) for x, y, block_type in self.pack.tiles(self.index)]
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+#class that reads a chunk pack using a memory map
+#the header and template table are read when opened but the tiles of each template
+#are only decoded the first time the template is used
+class ChunkPack:
+    def __init__(self, pack_path):
+        self.pack_path = pack_path
+        with open(pack_path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self._map.close()
+            raise ValueError(f"{pack_path} is not a chunk pack of version {PACK_VERSION}")
+
+        self.entries = []
+        self._chunks = {}
+        self._tiles = {}
+        for idx in range(count):
+            group, name, tunnel, pre_qty, post_qty, requisits_offset, tiles_offset, tiles_qty = \
+                ENTRY.unpack_from(self._map, HEADER.size + idx * ENTRY.size)
+            requisits = [list(r) for r in REQUISIT.iter_unpack(
+                self._map[requisits_offset:requisits_offset + (pre_qty + post_qty) * REQUISIT.size])]
+            self.entries.append({"group": group.rstrip(b"\0").decode(),
+                                 "name": name.rstrip(b"\0").decode(),
+                                 "tunnel": bool(tunnel),
+                                 "pre_requisits": requisits[:pre_qty],
+                                 "post_requisits": requisits[pre_qty:],
+                                 "tiles_offset": tiles_offset,
+                                 "tiles_qty": tiles_qty})
+
+    def __len__(self):
+        return len(self.entries)
+
+    #decode the tiles of a template (only the first time) as a flat int16 array x,y,type,x,y,type...
+    def tiles(self, index):
+        if index not in self._tiles:
+            entry = self.entries[index]
+            start = entry["tiles_offset"]
+            tiles = array("h", self._map[start:start + entry["tiles_qty"] * TILE.size])
+            if sys.byteorder == "big":
+                tiles.byteswap()
+            self._tiles[index] = tiles
+        tiles = self._tiles[index]
+        return zip(tiles[0::3], tiles[1::3], tiles[2::3])
+
+    #get the chunk template of a given index, the chunk blocks are only decoded when they are needed
+    def get_chunk(self, index):
+        if index not in self._chunks:
+            entry = self.entries[index]
+            self._chunks[index] = Chunk(0, PackedBlocks(self, index), entry["pre_requisits"],
+                                        entry["post_requisits"], entry["tunnel"])
+        return self._chunks[index]
+
+    #get all the chunk templates of a group ("normal" or "tunnel")
+    def group(self, group):
+        return [self.get_chunk(idx) for idx, entry in enumerate(self.entries) if entry["group"] == group]
+
+    #find a chunk template by group and file name
+    def find(self, group, name):
+        for idx, entry in enumerate(self.entries):
+            if entry["group"] == group and entry["name"] == name:
+                return self.get_chunk(idx)
+        return None
+
+    def close(self):
+        self._map.close()
+
+    #compiles every chunk file of the given directories into a single pack
+    #chunk_dirs is a dict of group name -> directory with json chunk files
+    #raises ValueError when a group or file name doesn't fit in its entry (it would be cut in the pack)
+    @staticmethod
+    def build(pack_path, chunk_dirs=CHUNK_DIRS):
+        entries = []
+        requisits = bytearray()
+        tiles = bytearray()
+        for group, file_path in chunk_dirs.items():
+            if len(group.encode()) > GROUP_SIZE:
+                raise ValueError(f"chunk group {group} ({file_path}) is longer than {GROUP_SIZE} bytes")
+            for f in sorted(listdir(file_path)):
+                if not isfile(join(file_path, f)):
+                    continue
+                if len(f.encode()) > NAME_SIZE:
+                    raise ValueError(f"chunk file {join(file_path, f)} has a name longer than {NAME_SIZE} bytes")
+                chunk = Chunk.load_chunk(0, join(file_path, f))
+                entries.append((group, f, chunk, len(requisits), len(tiles)))
+                for requisit in chunk.pre_requisits + chunk.post_requisits:
+                    requisits += REQUISIT.pack(*requisit)
+                for block in chunk.blocks:
+                    tiles += TILE.pack(block.x, block.y, block.block_type)
+
+        requisits_start = HEADER.size + len(entries) * ENTRY.size
+        tiles_start = requisits_start + len(requisits)
+        data = bytearray(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries)))
+        for group, name, chunk, requisits_offset, tiles_offset in entries:
+            data += ENTRY.pack(group.encode(), name.encode(), chunk.tunnel,
+                               len(chunk.pre_requisits), len(chunk.post_requisits),
+                               requisits_start + requisits_offset, tiles_start + tiles_offset,
+                               len(chunk.blocks))
+        data += requisits
+        data += tiles
+
+        with open(pack_path, "wb") as outfile:
+            outfile.write(data)
+
+    #checks if the pack is missing or older than any chunk file or directory
+    @staticmethod
+    def is_stale(pack_path, chunk_dirs=CHUNK_DIRS):
+        if not exists(pack_path):
+            return True
+        pack_time = getmtime(pack_path)
+        for file_path in chunk_dirs.values():
+            if not isdir(file_path):
+                continue
+            if getmtime(file_path) > pack_time:
+                return True
+            for f in listdir(file_path):
+                if getmtime(join(file_path, f)) > pack_time:
+                    return True
+        return False
+
+    #opens the pack rebuilding it first if the chunk files changed
+    @staticmethod
+    def load_or_build(pack_path=CHUNK_PACK_PATH, chunk_dirs=CHUNK_DIRS):
+        if ChunkPack.is_stale(pack_path, chunk_dirs):
+            ChunkPack.build(pack_path, chunk_dirs)
+        return ChunkPack(pack_path)
+
+
+#checks that a seed generates the same world from the pack as from the json files (World.loadJsonFiles)
+#returns the first position where the chunks differ, None if the worlds are the same (needs the display)
+def compare_with_json(seed=42, difficulty=2, time_limit=3):
+    from models.world import ChunkCompatibilityIndex, World
+
+    world = World(32, 20, 32)
+    worlds = []
+    for file_chunks in (world.file_chunks, world.loadJsonFiles()):
+        world.file_chunks = file_chunks
+        world.compatibility = ChunkCompatibilityIndex(file_chunks)
+        world.generateWorld(difficulty, time_limit, seed=seed)
+        worlds.append([(chunk.x, chunk.tunnel, chunk.pre_requisits, chunk.post_requisits,
+                        [(block.x, block.y, block.block_type) for block in chunk.blocks])
+                       for chunk in (world.world_chunks[pos] for pos in range(len(world.world_chunks)))])
+    pack_world, json_world = worlds
+    for pos, (pack_chunk, json_chunk) in enumerate(zip(pack_world, json_world)):
+        if pack_chunk != json_chunk:
+            return pos
+    return None if len(pack_world) == len(json_world) else min(len(pack_world), len(json_world))
+
+
+#build step: python -m models.chunk_pack [pack_path]
+#it also checks that the default pack generates the same worlds as the json files
+if __name__ == "__main__":
+    pack_path = sys.argv[1] if len(sys.argv) > 1 else CHUNK_PACK_PATH
+    ChunkPack.build(pack_path)
+    pack = ChunkPack(pack_path)
+    print(f"{len(pack)} chunk templates written to {pack_path}")
+    pack.close()
+    if pack_path == CHUNK_PACK_PATH:
+        import pygame
+
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        pygame.init()
+        pygame.display.set_mode((1, 1))
+        pos = compare_with_json()
+        pygame.quit()
+        if pos is not None:
+            print(f"the pack and the json files generate different worlds (chunk {pos})")
+            sys.exit(1)
+        print("the pack and the json files generate the same worlds")
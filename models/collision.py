@@ -0,0 +1,174 @@
+import logging
+import os
+from collections import Counter, namedtuple
+
+import pygame
+
+#collision modes
+#mask - every probe tests the sprite mask against the mask of each loaded chunk
+#grid - every probe looks up the tiles under the sprite in the tile grid
+#diff - does both, logs when they don't agree and uses the mask answer (to test the grid)
+MASK = "mask"
+GRID = "grid"
+DIFF = "diff"
+COLLISION_MODE = os.environ.get("WAVEBORN_COLLISION", GRID)
+
+
+#the mask used by pygame.sprite.collide_mask for a sprite
+def sprite_mask(sprite):
+    mask = getattr(sprite, "mask", None)
+    if mask is None:
+        mask = pygame.mask.from_surface(sprite.image)
+    return mask
+
+
+#tests a mask placed on rect moved (dx, dy) pixels against the masks of the loaded chunk sprites
+#(the same test as pygame.sprite.collide_mask)
+#returns a number with the bit of each chunk slot that collides
+def mask_probe(rect, mask, chunk_sprites, dx, dy):
+    hits = 0
+    x = rect.x + dx
+    y = rect.y + dy
+    for slot, chunk_sprite in enumerate(chunk_sprites):
+        if chunk_sprite and chunk_sprite.mask.overlap(mask, (x - chunk_sprite.rect.x, y - chunk_sprite.rect.y)):
+            hits |= 1 << slot
+    return hits
+
+
+#grid with one byte per block of the loaded chunks, 0 when there is no block
+#or the chunk slot + 1 of the block, in world coordinates starting at origin_col
+#the blocks of a chunk are solid squares so a probe only needs to look at the few tiles under the sprite
+class TileGrid:
+    def __init__(self, SCALE, cols, rows):
+        self.SCALE = SCALE
+        self.cols = cols
+        self.rows = rows
+        self.origin_col = 0
+        self.tiles = bytearray(cols * rows)
+        self.tile_mask = pygame.mask.Mask((SCALE, SCALE), fill=True)
+
+    #fills the grid with the blocks of the loaded chunk sprites
+    #origin_col is the world column of the first tile of the first slot
+    def build(self, chunk_sprites, origin_col):
+        self.origin_col = origin_col
+        self.tiles = bytearray(self.cols * self.rows)
+        for slot, chunk_sprite in enumerate(chunk_sprites):
+            if not chunk_sprite:
+                continue
+            chunk_col = chunk_sprite.chunk.x // self.SCALE - origin_col
+            for block in chunk_sprite.blocks:
+                col = chunk_col + block.x // self.SCALE
+                row = block.y // self.SCALE
+                if 0 <= col < self.cols and 0 <= row < self.rows:
+                    self.tiles[row * self.cols + col] = slot + 1
+
+    #the chunk slot + 1 of the block in a world tile (0 if there is none)
+    def tile(self, col, row):
+        col -= self.origin_col
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.tiles[row * self.cols + col]
+        return 0
+
+    #tests a mask placed on rect (screen coordinates) against the blocks under it
+    #returns a number with the bit of each chunk slot that collides
+    def probe(self, rect, mask, camera_x):
+        SCALE = self.SCALE
+        x = rect.x + camera_x
+        y = rect.y
+        hits = 0
+        for row in range(y // SCALE, (y + rect.height - 1) // SCALE + 1):
+            for col in range(x // SCALE, (x + rect.width - 1) // SCALE + 1):
+                tile = self.tile(col, row)
+                if tile and not hits & (1 << (tile - 1)) and \
+                        mask.overlap(self.tile_mask, (col * SCALE - x, row * SCALE - y)):
+                    hits |= 1 << (tile - 1)
+        return hits
+
+
+#the block contacts of an entity
+#ground - there is a block below it that is not a wall right behind it
+#wall - there is a block right in front of it
+#ceiling - there is a block right above it
+Contacts = namedtuple("Contacts", ["ground", "wall", "ceiling"])
+
+
+#collision service shared by the player and all the monsters
+#it keeps the tile grid of the loaded chunks (rebuilt only when they change) and the camera position
+#and answers the collision probes using the mode in COLLISION_MODE
+#queries counts the probes of the current frame and frame_queries the ones of the last frame
+class CollisionWorld:
+    def __init__(self, SCALE, cols, rows, mode=COLLISION_MODE):
+        self.mode = mode
+        self.grid = TileGrid(SCALE, cols, rows)
+        self.chunk_sprites = []
+        self.camera_x = 0
+        self.mismatches = 0
+        self.queries = Counter()
+        self.frame_queries = Counter()
+
+    #builds the broadphase (tile grid) from the loaded chunk sprites
+    def build(self, chunk_sprites, origin_col):
+        self.chunk_sprites = chunk_sprites
+        self.grid.build(chunk_sprites, origin_col)
+
+    #called once at the start of each frame to keep the query counts per frame
+    def begin_frame(self):
+        self.frame_queries = self.queries
+        self.queries = Counter()
+
+    #tests a mask placed on rect moved (dx, dy) pixels against the loaded chunks
+    #returns a number with the bit of each chunk slot that collides (0 if none)
+    def probe_rect(self, rect, mask, dx, dy):
+        self.queries["probe"] += 1
+        if self.mode == MASK:
+            return mask_probe(rect, mask, self.chunk_sprites, dx, dy)
+
+        hits = self.grid.probe(rect.move(dx, dy), mask, self.camera_x)
+        if self.mode == DIFF:
+            expected = mask_probe(rect, mask, self.chunk_sprites, dx, dy)
+            if hits != expected:
+                self.mismatches += 1
+                logging.warning(f"tile grid probe at {rect} moved ({dx}, {dy}) "
+                                f"gave {hits:05b} but the masks gave {expected:05b}")
+            return expected
+        return hits
+
+    #same as probe_rect for a sprite
+    def probe(self, sprite, dx=0, dy=0):
+        return self.probe_rect(sprite.rect, sprite_mask(sprite), dx, dy)
+
+    def _ground(self, rect, mask, direction):
+        below = self.probe_rect(rect, mask, 0, 5)
+        if not below:
+            return False
+        return bool(below & ~self.probe_rect(rect, mask, -5 * direction, 0))
+
+    #there is a block below the sprite that is not a wall right behind it (direction is where it is going)
+    def ground_under(self, sprite, direction):
+        self.queries["ground"] += 1
+        return self._ground(sprite.rect, sprite_mask(sprite), direction)
+
+    #there is a block dx pixels in front of the sprite
+    def wall_ahead(self, sprite, dx):
+        self.queries["wall"] += 1
+        return bool(self.probe_rect(sprite.rect, sprite_mask(sprite), dx, 0))
+
+    #there is a block right above the sprite
+    def ceiling_above(self, sprite):
+        self.queries["ceiling"] += 1
+        return bool(self.probe_rect(sprite.rect, sprite_mask(sprite), 0, -5))
+
+    #answers the probes of many entities in one call
+    #entities is a list of (rect, mask, direction, wall_offset) and returns a list of Contacts
+    #the probes that are not asked for are left as None
+    def query(self, entities, ground=True, wall=True, ceiling=True):
+        self.queries["batch"] += 1
+        contacts = []
+        for rect, mask, direction, wall_offset in entities:
+            self.queries["entity"] += 1
+            contacts.append(Contacts(
+                self._ground(rect, mask, direction) if ground else None,
+                bool(self.probe_rect(rect, mask, wall_offset * direction, 0)) if wall else None,
+                bool(self.probe_rect(rect, mask, 0, -5)) if ceiling else None,
+            ))
+        return contacts
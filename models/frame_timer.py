@@ -0,0 +1,126 @@
+import csv
+import os
+import time
+
+import numpy as np
+import pygame
+
+#the stages of a frame in the order they run
+#the ticks of a frame add their times to the same stages
+STAGES = ["events", "input", "spawn", "chunks", "move_world", "camera", "waves", "sprites_update",
+          "sprites_draw", "monster_draw", "mask", "overlay", "flip"]
+PROFILE = os.environ.get("WAVEBORN_PROFILE", "") not in ("", "0")
+
+
+def _skip(stage):
+    pass
+
+
+#times each stage of the last "size" frames in a ring buffer (one row of stage times per frame)
+#lap(stage) gives the time since the last lap to that stage, begin_frame and end_frame start and store a frame
+#when it is disabled lap, begin_frame and end_frame are functions that do nothing so the hooks cost almost nothing
+#the overlay shows the mean, p95 and max of every stage in milliseconds
+class FrameTimer:
+    _singleton = None
+
+    def __init__(self, stages=STAGES, size=600, enabled=PROFILE):
+        self.stages = list(stages)
+        self.index = {stage: idx for idx, stage in enumerate(self.stages)}
+        self.times = np.zeros((size, len(self.stages)))
+        self.size = size
+        self.frames = 0
+        self.current = [0.0] * len(self.stages)
+        self.last = time.perf_counter()
+        self.overlay = None
+        self.overlay_frame = -1
+        self.font = None
+        self.set_enabled(enabled)
+        FrameTimer._singleton = self
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._begin_frame()
+            self.lap = self._lap
+            self.begin_frame = self._begin_frame
+            self.end_frame = self._end_frame
+        else:
+            self.lap = _skip
+            self.begin_frame = lambda: None
+            self.end_frame = lambda: None
+
+    def toggle(self):
+        self.set_enabled(not self.enabled)
+
+    def _begin_frame(self):
+        self.current = [0.0] * len(self.stages)
+        self.last = time.perf_counter()
+
+    def _lap(self, stage):
+        now = time.perf_counter()
+        self.current[self.index[stage]] += now - self.last
+        self.last = now
+
+    def _end_frame(self):
+        self.times[self.frames % self.size] = self.current
+        self.frames += 1
+
+    #the stored frames from the oldest to the newest, in seconds
+    def history(self):
+        if self.frames <= self.size:
+            return self.times[:self.frames]
+        start = self.frames % self.size
+        return np.concatenate((self.times[start:], self.times[:start]))
+
+    #dict of stage -> (mean, p95, max) in milliseconds
+    def stats(self):
+        history = self.history() * 1000
+        if not len(history):
+            return {}
+        means = history.mean(axis=0)
+        p95s = np.percentile(history, 95, axis=0)
+        maxs = history.max(axis=0)
+        return {stage: (means[idx], p95s[idx], maxs[idx]) for idx, stage in enumerate(self.stages)}
+
+    #writes the stored frames to a csv file (one row per frame, milliseconds)
+    def export_csv(self, file_path):
+        with open(file_path, "w", newline="") as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(["frame"] + self.stages + ["total"])
+            first = self.frames - len(self.history())
+            for frame, row in enumerate(self.history() * 1000, start=first):
+                writer.writerow([frame] + [f"{t:.4f}" for t in row] + [f"{row.sum():.4f}"])
+        return file_path
+
+    #draws the stats on the top right of the screen (rendered again every "every" frames)
+    #returns the rect drawn
+    def draw(self, screen, every=30):
+        if self.overlay is None or self.frames - self.overlay_frame >= every:
+            self.overlay = self._render()
+            self.overlay_frame = self.frames
+        rect = self.overlay.get_rect(topright=(screen.get_width(), 0))
+        return screen.blit(self.overlay, rect)
+
+    def _render(self):
+        if not self.font:
+            self.font = pygame.font.SysFont("monospace", 14)
+        stats = self.stats()
+        lines = [f"{'stage':<15}{'mean':>7}{'p95':>7}{'max':>7}"]
+        lines += [f"{stage:<15}{mean:>7.2f}{p95:>7.2f}{max_:>7.2f}" for stage, (mean, p95, max_) in stats.items()]
+        if stats:
+            total = self.history().sum(axis=1) * 1000
+            lines.append(f"{'total':<15}{total.mean():>7.2f}{np.percentile(total, 95):>7.2f}{total.max():>7.2f}")
+        rendered = [self.font.render(line, False, (255, 255, 255)) for line in lines]
+        height = self.font.get_linesize()
+        overlay = pygame.Surface((max(r.get_width() for r in rendered) + 8, height * len(rendered) + 8))
+        overlay.fill((0, 0, 0))
+        for idx, line in enumerate(rendered):
+            overlay.blit(line, (4, 4 + idx * height))
+        return overlay
+
+    #initiate or get an existing singleton
+    @staticmethod
+    def get_or_create(**kwargs):
+        if FrameTimer._singleton:
+            return FrameTimer._singleton
+        return FrameTimer(**kwargs)
@@ -38,6 +38,10 @@ class FSM:
         self.current: State = self._states[0]
         self.end: State = self._states[-1]
 
+    def reset(self):
+        # back to the first state (for an object that is reused)
+        self.current = self._states[0]
+
     def update(self, event, object):
         if event:
             for trans in self._transitions.get(event):
@@ -0,0 +1,321 @@
+import os
+import random
+import sys
+import struct
+import time
+import zlib
+from collections import namedtuple
+
+import pygame
+from pygame import sprite
+
+from models.frame_timer import FrameTimer
+from models.monster_pool import STRESS
+from models.monsters import Monster, BirdLike, Spawner, SpiderLike, TurtleLike, Whale
+from models.player import Player
+from models.sound import VoicePool
+from models.timestep import GameClock, Interpolation
+from models.wave import Waves
+from models.world import World
+from sprites.background_sprite import BackgroundSprite
+from sprites.monster_sprites import SpiderLikeSprite, BirdLikeSprite, TurtleLikeSprite, WhaleSprite, MonsterPoolSprite
+from sprites.player_sprite import PlayerSprite
+
+#the keys held during a tick
+Inputs = namedtuple("Inputs", ["left", "right", "jump"])
+
+
+#the game without the window, menus or keyboard
+#reset starts a new game and step runs one tick of it with the given inputs
+#so it can run with the SDL dummy drivers (benchmarks, soak tests)
+#a display mode has to be set before creating it (the sprites convert their images to the display format)
+#result is None while the game is running, True when the player won and False when the player lost
+#stress is the number of monsters kept alive in the stress mode (0 plays the normal game)
+class Game:
+    def __init__(self, WIDTH=1024, HEIGHT=640, SCALE=32, stress=STRESS):
+        self.WIDTH = WIDTH
+        self.HEIGHT = HEIGHT
+        self.SCALE = SCALE
+        self.stress = stress
+        self.world = World(int(WIDTH / SCALE), int(HEIGHT / SCALE), SCALE)
+        self.mask = pygame.Surface((WIDTH, HEIGHT))
+        self.mask.set_colorkey((0, 0, 255))
+        self.hardmode = False
+        self.result = None
+        self.timer = FrameTimer.get_or_create()
+        self.voices = VoicePool.get_or_create()
+
+    #starts a new game, the same seed always makes the same world
+    def reset(self, seed=None, difficulty=0):
+        WIDTH, HEIGHT, SCALE = self.WIDTH, self.HEIGHT, self.SCALE
+        world = self.world
+        if seed is not None:
+            random.seed(seed)
+        GameClock.reset()
+        world.generateWorld(difficulty, difficulty + 1, seed=seed)
+        world.startWorld()
+        self.seed = world.seed
+        self.difficulty = difficulty
+        self.result = None
+        self.ticks = 0
+        self.moved = 0
+
+        self.all_sprites = sprite.Group()
+
+        # loading the images
+        self.background_sprite = BackgroundSprite(width=WIDTH, height=HEIGHT)
+        self.player = Player(50, 500)
+        Monster.set_user_pos(self.player.pos)
+        self.player.controls(pygame.K_a, pygame.K_d, pygame.K_SPACE)
+        self.player_sprite = PlayerSprite(HEIGHT, self.player, [SpiderLikeSprite, BirdLikeSprite, TurtleLikeSprite],
+                                          SCALE)
+        Player.SPRITE = self.player_sprite
+
+        #spawner and templates
+        self.spawner = Spawner()
+        self.bird = BirdLike(width=WIDTH, height=HEIGHT, stop_width=WIDTH, stop_height=HEIGHT // 2)
+        self.spider = SpiderLike(width=WIDTH, height=HEIGHT, start_width=100, stop_width=WIDTH, stop_height=460,
+                                 attack_prob=0.05)
+        self.turtle = TurtleLike(width=WIDTH, height=HEIGHT, start_width=100, stop_width=WIDTH, stop_height=460,
+                                 attack_prob=0.01)
+        self.whale = Whale(width=WIDTH, height=HEIGHT, stop_width=WIDTH, stop_height=HEIGHT, attack_prob=0.1)
+
+        #initialize sprite objects
+        self.bird_sprite = BirdLikeSprite([], WIDTH, HEIGHT, SCALE)
+        self.spider_sprite = SpiderLikeSprite([], WIDTH, HEIGHT, SCALE)
+        SpiderLike.SPRITE = self.spider_sprite
+        self.turtle_sprite = TurtleLikeSprite([], WIDTH, HEIGHT, SCALE)
+        TurtleLike.SPRITE = self.turtle_sprite
+        self.whale_sprite = WhaleSprite([], SCALE)
+        Whale.SPRITE = self.whale_sprite
+        if self.stress:
+            # the monsters live in pools that update all of them at once, with the images and sounds of the sprites
+            self.bird_sprite = MonsterPoolSprite(self.bird, self.bird_sprite)
+            self.spider_sprite = MonsterPoolSprite(self.spider, self.spider_sprite)
+            self.turtle_sprite = MonsterPoolSprite(self.turtle, self.turtle_sprite)
+            self.whale_sprite = MonsterPoolSprite(self.whale, self.whale_sprite)
+            self.player_sprite.enemies = [self.spider_sprite, self.bird_sprite, self.turtle_sprite]
+
+        self.monster_sprites = [self.bird_sprite, self.spider_sprite, self.turtle_sprite, self.whale_sprite]
+        self.all_sprites.add(*self.monster_sprites)
+        self.all_sprites.add(self.background_sprite)
+        self.all_sprites.add(self.player_sprite)
+
+        self.waves = Waves()
+        self.interpolation = Interpolation()
+
+        for chunk in world.loaded_chunks:
+            if chunk:
+                self.all_sprites.add(chunk)
+
+    #runs one tick of the game, inputs is None when no key was ever pressed
+    #returns the result of the game (None while it is running)
+    def step(self, inputs=None):
+        if self.result is not None:
+            return self.result
+        world = self.world
+        player = self.player
+        player_sprite = self.player_sprite
+        lap = self.timer.lap
+
+        #initial arguments
+        camera_move = True
+        movement = 0
+        self.ticks += 1
+        GameClock.tick()
+        world.collision.begin_frame()
+        self.interpolation.snapshot(self.draw_rects())
+
+        if inputs:
+            if inputs.left:
+                player.command(player.left_key)
+                if (world.current_chunk <= 0 or world.current_chunk >= len(world.world_chunks) - 1):
+                    camera_move = False
+                movement = -1
+            if inputs.right:
+                player.command(player.right_key)
+                if (world.current_chunk >= len(world.world_chunks) - 1 or world.current_chunk <= 0):
+                    camera_move = False
+                movement = 1
+            if inputs.jump:
+                if (not player_sprite.jumping and not player_sprite.falling):
+                    player.command(player.jump_key)
+                    movement = -player.direction[0]
+            else:
+                player_sprite.can_jump_again()
+        lap("input")
+
+        #update game
+        if self.stress:
+            self.spawn_stress()
+        else:
+            self.spawn_monsters()
+        lap("spawn")
+
+        # world interaction
+        self.moved += movement
+        if int(self.moved / (self.SCALE * 16)) == 1:
+            removed, added = world.loadNextChunk()
+            if removed:
+                self.all_sprites.remove(removed)
+            if added:
+                self.all_sprites.add(added)
+                if added.chunk.end_sprite:
+                    self.all_sprites.add(added.chunk.end_sprite)
+            self.moved = 0
+        elif (int(self.moved / (self.SCALE * 16)) == -1):
+            removed, added = world.loadPrevChunk()
+            if removed:
+                self.all_sprites.remove(removed)
+            if added:
+                self.all_sprites.add(added)
+                if added.chunk.end_sprite:
+                    self.all_sprites.remove(added.chunk.end_sprite)
+            self.moved = 0
+        lap("chunks")
+
+        # the laps run on every tick (about 0 when the camera doesn't move) so every stage covers the same ticks
+        if (camera_move):
+            # world movement
+            world.moveWorld(movement)
+        lap("move_world")
+
+        if (camera_move):
+            world.moveCamera(movement)
+
+            self.waves.shift(movement)
+            # counter entity movement with world
+            player_sprite.update_camera_movement(movement)
+            for monster_sprite in self.monster_sprites:
+                monster_sprite.update_camera_movement(movement)
+        lap("camera")
+
+        self.waves.expire(self.WIDTH, self.HEIGHT)
+        self.waves.update()
+        lap("waves")
+
+        if player.won:
+            #instead of game over -> game win
+            self.result = True
+            return self.result
+
+        if player.dead or world.timeout():
+            self.result = False
+            return self.result
+
+        # the monsters' sounds far from the player are the first to lose their channel
+        self.voices.listener = player_sprite.rect.center
+        self.all_sprites.update()
+        for monster_sprite in self.monster_sprites:
+            monster_sprite.animate()
+        lap("sprites_update")
+        return self.result
+
+    #crc32 of the state that matters to the game (player, camera, monsters and waves)
+    #two runs of the same game with the same inputs have the same hash at every tick
+    def state_hash(self):
+        player_sprite = self.player_sprite
+        world = self.world
+        state = [struct.pack("<iiiii??", self.ticks, player_sprite.rect.x, player_sprite.rect.y, world.camera_x,
+                             world.current_chunk, player_sprite.jumping, player_sprite.falling)]
+        for monster_sprite in self.monster_sprites:
+            state.append(monster_sprite.state_bytes())
+        n = self.waves.size
+        state.append(self.waves.x[:n].tobytes())
+        state.append(self.waves.y[:n].tobytes())
+        state.append(self.waves.radius[:n].tobytes())
+        return zlib.crc32(b"".join(state))
+
+    #spawns a new monster now and then while there are less than the world allows
+    def spawn_monsters(self):
+        if(random.randint(0,100) < 5 and self.world.num_monsters > (len(self.bird_sprite.monsters) + len(self.spider_sprite.monsters) + len(self.turtle_sprite.monsters))):
+            selectMonster = random.randint(0,100)
+            if(selectMonster <= 19 and len(self.whale_sprite.monsters) < 1):
+                self.add_monster(self.whale_sprite, self.whale)
+            elif(selectMonster <= 44):
+                self.add_monster(self.bird_sprite, self.bird)
+            elif(selectMonster <= 69):
+                self.add_monster(self.spider_sprite, self.spider)
+            elif(selectMonster <= 100):
+                self.add_monster(self.turtle_sprite, self.turtle)
+
+    #the spawner gives no monster when it finds no free spot for it, it will try again on a later tick
+    def add_monster(self, monster_sprite, prototype):
+        monster = self.spawner.spawn_monster(prototype)
+        if monster:
+            monster_sprite._add_monster(monster)
+
+    #stress mode: keeps the pools full, 2/5 of the monsters are birds, 3/10 spiders and 3/10 turtles
+    #with a whale for every 200 monsters
+    def spawn_stress(self):
+        stress = self.stress
+        targets = [(self.bird_sprite, stress * 2 // 5), (self.spider_sprite, stress * 3 // 10),
+                   (self.turtle_sprite, stress - stress * 2 // 5 - stress * 3 // 10),
+                   (self.whale_sprite, max(1, stress // 200))]
+        for monster_sprite, target in targets:
+            if len(monster_sprite) < target:
+                monster_sprite.spawn(target - len(monster_sprite))
+
+    # rects of everything drawn that moves, to interpolate them between ticks
+    def draw_rects(self):
+        rects = [(s, s.rect) for s in self.all_sprites if s not in self.monster_sprites]
+        for monster_sprite in self.monster_sprites:
+            rects += monster_sprite.draw_rects()
+        return rects
+
+    #draws the game to the screen between the last tick (alpha 0) and the current one (alpha 1)
+    #with doreturn it returns the rects seen through the visibility mask
+    def draw(self, screen, alpha=1.0, doreturn=False):
+        mask = self.mask
+        lap = self.timer.lap
+        # create cover surface
+        mask.fill(0)
+
+        self.interpolation.apply(self.draw_rects(), alpha)
+
+        self.all_sprites.draw(screen)
+        lap("sprites_draw")
+        for monster_sprite in self.monster_sprites:
+            monster_sprite.draw(screen, alpha)
+        lap("monster_draw")
+
+        drawn = self.waves.draw(mask, doreturn=doreturn, alpha=alpha) or []
+
+        if not self.hardmode:
+            drawn.append(self.player_sprite.draw(mask))
+
+        self.interpolation.restore()
+
+        # draw transparent circle
+        screen.blit(mask, (0, 0))
+        drawn.append(screen.blit(self.world.get_time_passed_surface(), (0,0)))
+        lap("mask")
+        return drawn if doreturn else None
+
+
+#headless run: python -m models.game [ticks] [seed] [difficulty] [stress]
+#plays random inputs with the SDL dummy drivers (starting a new game when one ends) and prints the ticks per second
+#stress > 0 plays the stress mode with that many monsters
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    difficulty = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    stress = int(sys.argv[4]) if len(sys.argv) > 4 else STRESS
+
+    pygame.init()
+    pygame.display.set_mode((1024, 640))
+    game = Game(stress=stress)
+    game.reset(seed, difficulty)
+    inputs_rng = random.Random(seed)
+    games = 1
+    start = time.perf_counter()
+    for _ in range(ticks):
+        inputs = Inputs(inputs_rng.random() < 0.1, inputs_rng.random() < 0.7, inputs_rng.random() < 0.05)
+        if game.step(inputs) is not None:
+            game.reset(seed + games, difficulty)
+            games += 1
+    elapsed = time.perf_counter() - start
+    print(f"{ticks} ticks in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s), {games} games")
+    pygame.quit()
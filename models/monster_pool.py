@@ -0,0 +1,425 @@
+import os
+import random
+
+import numpy as np
+
+from models.monsters import SPAWN_TRIES, GroundMonster, Monster, Whale
+from models.timestep import GameClock
+from models.wave import Wave, Waves
+from models.world import World
+
+#ids of the states of the FSM of the monsters (see models.fsm)
+MOVE = 0
+ATTACK = 1
+JUMP = 2
+FALL = 3
+DEAD = 4
+MOVE_IN_AIR = 5
+DYING = 6
+
+#kinds of monsters, each one has the behaviour of one of the monster classes
+FLYING = "flying"  # BirdLike
+GROUND = "ground"  # SpiderLike and TurtleLike
+WHALE = "whale"  # Whale
+
+#WAVEBORN_STRESS=n keeps n monsters alive in pools instead of the monster objects (see Game)
+STRESS = int(os.environ.get("WAVEBORN_STRESS", 0))
+NO_TIME = 1 << 31  # a time that has not happened yet
+
+FIELDS = {
+    "x": np.float64,
+    "y": np.float64,
+    "rect_x": np.int64,  # position of the rect of the monster at the last animate (the one the probes use)
+    "rect_y": np.int64,
+    "prev_x": np.float64,  # rect before the last animate, NaN for new monsters (to interpolate the drawing)
+    "prev_y": np.float64,
+    "direction": np.int8,
+    "state": np.int8,
+    "jump_count": np.int32,
+    "fail_speed": np.int32,
+    "dying": np.bool_,
+    "is_dead": np.bool_,
+    "attacking": np.bool_,
+    "jumping": np.bool_,
+    "falling": np.bool_,
+    "img_index": np.int32,
+    "shown": np.bool_,  # drawn at least once (only those are interpolated)
+    "ids": np.int64,
+    "attack_time": np.float64,  # whales
+    "wait": np.int32,  # random wait of the attacks (whales) or the cries (birds and turtles)
+    "during_attack": np.bool_,
+    "cry_time": np.float64,
+    "cry_finished": np.float64,
+    "sound": object,  # the Sound handle of each monster, made the first time it cries
+}
+
+
+#the monsters of one type stored as a struct of arrays, one array per field and one index per monster
+#update runs the FSM of every monster with array operations (per state mask) instead of one python call per monster
+#keeping the behaviour of the monster class of the prototype:
+#BirdLike (FLYING), SpiderLike and TurtleLike (GROUND) or Whale (WHALE)
+#the rolls (want_attack and want_cry) use a numpy generator seeded from random, so a seeded game plays the same
+#the monsters are removed by moving the last ones into the free slots, so the indexes of the monsters change
+class MonsterPool:
+    def __init__(self, prototype, sprite_size, capacity=256):
+        if isinstance(prototype, Whale):
+            self.kind = WHALE
+        elif isinstance(prototype, GroundMonster):
+            self.kind = GROUND
+        else:
+            self.kind = FLYING
+        self.prototype = prototype
+        self.width, self.height = sprite_size
+        self.capacity = capacity
+        self.size = 0
+        self.failed_spawns = 0
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        for field, dtype in FIELDS.items():
+            setattr(self, field, np.zeros(capacity, dtype))
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, size):
+        capacity = self.capacity
+        while capacity < size:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        for field, dtype in FIELDS.items():
+            array = np.zeros(capacity, dtype)
+            array[:self.size] = getattr(self, field)[:self.size]
+            setattr(self, field, array)
+        self.capacity = capacity
+
+    #adds up to count monsters where the prototype would spawn them
+    #the spots are drawn at most max_tries times (the monsters without a free spot are not added)
+    #returns the slice of the new monsters
+    def spawn(self, count, max_tries=SPAWN_TRIES):
+        proto = self.prototype
+        if self.kind == WHALE:
+            xs = np.full(count, proto.stop_width // 2, np.float64)
+            ys = np.full(count, 50, np.float64)
+        else:
+            xs, ys = self._free_spots(count, max_tries)
+            if self.kind == GROUND:
+                xs, ys = self._ground_spots(xs, max_tries)
+        self.failed_spawns += count - len(xs)
+
+        start = self.size
+        stop = start + len(xs)
+        self._grow(stop)
+        new = slice(start, stop)
+        for field, dtype in FIELDS.items():
+            getattr(self, field)[new] = None if dtype is object else 0
+        self.x[new] = xs
+        self.y[new] = ys
+        self.rect_x[new] = xs
+        self.rect_y[new] = ys
+        self.prev_x[new] = np.nan
+        self.prev_y[new] = np.nan
+        if self.kind == WHALE:
+            self.direction[new] = -1
+            self.attack_time[new] = NO_TIME
+            self.wait[new] = self.rng.integers(1, proto.attack_interval + 1, len(xs))
+        else:
+            self.direction[new] = self.rng.choice(np.array([-1, 1], np.int8), len(xs))
+        self.fail_speed[new] = 1
+        self.cry_time[new] = np.nan
+        self.ids[new] = np.arange(Monster._ID, Monster._ID + len(xs))
+        Monster._ID += len(xs)
+        self.size = stop
+        return new
+
+    #Monster.spawn: a random spot away from the player that is not inside the blocks
+    def _free_spots(self, count, max_tries):
+        proto = self.prototype
+        rng = self.rng
+        if not Monster.USER_POS:
+            return (rng.integers(proto.stop_width - 16 * 15, proto.stop_width, count).astype(np.float64),
+                    rng.integers(proto.start_height, proto.stop_height, count).astype(np.float64))
+
+        xs = []
+        ys = []
+        user_x = Monster.USER_POS[0]
+        for _ in range(max_tries):
+            x = rng.integers(proto.stop_width - 16 * 8, proto.stop_width, count)
+            y = rng.integers(proto.start_height, proto.stop_height, count)
+            ok = ((x >= user_x + Monster.USER_WIDTH_OFFSET) | (x <= user_x - Monster.USER_WIDTH_OFFSET)) & \
+                 ~self._inside_walls(x, y)
+            xs.append(x[ok])
+            ys.append(y[ok])
+            count -= int(ok.sum())
+            if not count:
+                break
+        return np.concatenate(xs).astype(np.float64), np.concatenate(ys).astype(np.float64)
+
+    #GroundMonster.spawn: on the bottom of the world, going up 16 pixels at a time while inside the blocks
+    def _ground_spots(self, xs, max_tries):
+        ys = np.full(len(xs), self.prototype.stop_height, np.float64)
+        inside = self._inside_walls(xs, ys)
+        for _ in range(max_tries):
+            if not inside.any():
+                break
+            ys[inside] -= 16
+            inside[inside] = self._inside_walls(xs[inside], ys[inside])
+        return xs[~inside], ys[~inside]
+
+    #Monster.check_inside_walls for many positions
+    def _inside_walls(self, xs, ys):
+        blocks = World.get_or_create().get_blocks()
+        if not blocks or not len(xs):
+            return np.zeros(len(xs), np.bool_)
+        bx = np.array([b.rect.x for b in blocks])
+        by = np.array([b.rect.y for b in blocks])
+        return ((np.abs(xs[:, None] - bx) < 32) & (np.abs(ys[:, None] - by) < 32)).any(axis=1)
+
+    #TileGrid.probe for the rects of the monsters moved (dx, dy) pixels
+    #the mask of a monster sprite is its whole rect, so it hits every tile under the rect
+    def _probe(self, collision, dx, dy):
+        grid = collision.grid
+        SCALE = grid.SCALE
+        n = self.size
+        tiles = np.frombuffer(grid.tiles, np.uint8).reshape(grid.rows, grid.cols)
+        x = self.rect_x[:n] + dx + collision.camera_x
+        y = self.rect_y[:n] + dy
+        first_col = x // SCALE - grid.origin_col
+        first_row = y // SCALE
+        last_col = (x + self.width - 1) // SCALE - grid.origin_col
+        last_row = (y + self.height - 1) // SCALE
+        hits = np.zeros(n, np.int64)
+        for row_offset in range((self.height - 1) // SCALE + 2):
+            rows = first_row + row_offset
+            for col_offset in range((self.width - 1) // SCALE + 2):
+                cols = first_col + col_offset
+                inside = (rows <= last_row) & (cols <= last_col) & \
+                         (rows >= 0) & (rows < grid.rows) & (cols >= 0) & (cols < grid.cols)
+                tile = np.where(inside, tiles[rows.clip(0, grid.rows - 1), cols.clip(0, grid.cols - 1)], 0)
+                hits |= np.where(tile > 0, np.left_shift(1, np.maximum(tile.astype(np.int64), 1) - 1), 0)
+        return hits
+
+    #the block contacts of every monster (CollisionWorld.query with the direction of each monster)
+    def contacts(self, collision, ground):
+        collision.queries["pool"] += 1
+        n = self.size
+        direction = self.direction[:n].astype(np.int64)
+        wall = self._probe(collision, self.prototype.offset * direction, 0) != 0
+        if not ground:
+            return wall, None
+        below = self._probe(collision, 0, 5)
+        behind = self._probe(collision, -5 * direction, 0)
+        return wall, (below & ~behind) != 0
+
+    #the monsters whose rect collides with a rect (pygame.Rect.colliderect)
+    def colliding(self, rect):
+        n = self.size
+        x = self.rect_x[:n]
+        y = self.rect_y[:n]
+        return (x < rect.right) & (rect.x < x + self.width) & (y < rect.bottom) & (rect.y < y + self.height)
+
+    def out_of_world(self):
+        n = self.size
+        x = self.x[:n]
+        y = self.y[:n]
+        left = -100 if self.kind == WHALE else 0
+        return (x < left) | (x > self.prototype.width) | (y > self.prototype.height) | (y < 0)
+
+    #one update of every monster that is not dying (Monster.update and its FSM)
+    #player is the player sprite and collision the CollisionWorld
+    def update(self, player, collision):
+        if not self.size:
+            return
+        alive = ~self.dying[:self.size]
+        if self.kind == FLYING:
+            self._update_flying(alive, player, collision)
+        elif self.kind == GROUND:
+            self._update_ground(alive, player, collision)
+        else:
+            self._update_whale(alive, collision)
+
+    def _stepped_on(self, player):
+        return self.colliding(player.rect) & bool(player.falling) & (player.rect.y < self.rect_y[:self.size])
+
+    def roll(self, probability):
+        return self.rng.random(self.size) <= probability
+
+    #BirdLike.update
+    def _update_flying(self, alive, player, collision):
+        n = self.size
+        state = self.state[:n]
+        wall, _ = self.contacts(collision, ground=False)
+        dead = alive & (self._stepped_on(player) | self.out_of_world())
+        to_move = alive & ~dead & (state == ATTACK)
+        to_attack = alive & ~dead & (state == MOVE) & self.roll(self.prototype.attack_prob)
+        moving = to_move | (alive & ~dead & ~to_attack & (state == MOVE))
+
+        state[dead] = DEAD
+        self.is_dead[:n][dead] = True
+        state[to_move] = MOVE
+        self.attacking[:n][to_move] = False
+        state[to_attack] = ATTACK
+        self.attacking[:n][to_attack] = True
+        self._move(moving, wall)
+
+    #GroundMonster.update
+    def _update_ground(self, alive, player, collision):
+        n = self.size
+        proto = self.prototype
+        state = self.state[:n]
+        wall, ground = self.contacts(collision, ground=True)
+        rest = alive.copy()
+
+        dying = rest & self._stepped_on(player)
+        rest &= ~dying
+        dying &= state != MOVE_IN_AIR
+        state[dying] = DYING
+        self.dying[:n][dying] = True
+        self.attacking[:n][dying] = False
+
+        out = rest & self.out_of_world()
+        rest &= ~out
+        out &= state != MOVE_IN_AIR
+        state[out] = DEAD
+        self.is_dead[:n][out] = True
+
+        to_fall = rest & (state == JUMP) & self.falling[:n]
+        rest &= ~to_fall
+        to_move = rest & (state == FALL) & ~self.falling[:n]
+        rest &= ~to_move
+        to_jump = rest & (state == ATTACK)
+        rest &= ~to_jump
+        in_air = rest & (state == MOVE) & ~ground
+        rest &= ~in_air
+        near = rest & (state == MOVE) & (np.abs(player.y - self.y[:n]) < 32) & \
+               (np.abs(player.x - self.x[:n]) < 128)
+        to_attack = near & self.roll(proto.attack_prob) & ~self.attacking[:n]
+        rest &= ~to_attack
+        air_fall = rest & (state == MOVE_IN_AIR)
+        rest &= ~air_fall
+
+        state[to_fall] = FALL
+        state[to_move] = MOVE
+        self.fail_speed[:n][to_move] = 1
+        self.attacking[:n][to_move] = False
+        state[to_jump] = JUMP
+        state[in_air] = MOVE_IN_AIR
+        self.jumping[:n][in_air] = False
+        self.falling[:n][in_air] = True
+        self.direction[:n][to_attack] = np.where(player.rect.x < self.x[:n][to_attack], -1, 1)
+        state[to_attack] = ATTACK
+        self.attacking[:n][to_attack] = True
+        self.jumping[:n][to_attack] = True
+        self.falling[:n][to_attack] = False
+        self.jump_count[:n][to_attack] = 0
+        self.img_index[:n][to_attack] = 0
+        state[air_fall] = FALL
+        self.fail_speed[:n][air_fall] = 2
+
+        self._move(to_move | (rest & (state == MOVE)), wall)
+        self._jump(to_jump | (rest & (state == JUMP)), wall)
+        self._fall(to_fall | air_fall | (rest & (state == FALL)), wall, ground)
+
+    #Whale.update
+    def _update_whale(self, alive, collision):
+        n = self.size
+        state = self.state[:n]
+        now = GameClock.now()
+        wall, _ = self.contacts(collision, ground=False)
+        out = alive & self.out_of_world()
+        rest = alive & ~out
+        to_move = rest & (state == ATTACK) & (now - self.attack_time[:n] >= self.prototype.attack_interval)
+        rest &= ~to_move
+        to_attack = rest & (state == MOVE) & self.roll(self.prototype.attack_prob)
+        rest &= ~to_attack
+
+        state[out] = DEAD
+        self.is_dead[:n][out] = True
+        state[to_move] = MOVE
+        self.attacking[:n][to_move] = False
+        self.img_index[:n][to_move] = 0
+        state[to_attack] = ATTACK
+        self.attack_time[:n][to_attack] = now
+        self.img_index[:n][to_attack] = 0
+        waves = Waves.get_or_create()
+        for idx in np.flatnonzero(to_attack & ~self.attacking[:n]):
+            x, y = self.x[idx], self.y[idx]
+            waves.add_wave(Wave([x + (x / 4), 3.5 * y], 1, 144, [0, self.wait[idx] / 2]))
+        self.attacking[:n][to_attack] = True
+        self._move(to_move | (rest & (state == MOVE)), wall)
+
+    #Monster.turn_dirc_if_hit_wall for the monsters in which, returns the ones that hit a wall
+    def _turn(self, which, wall):
+        n = self.size
+        hit = which & wall
+        turn = hit & ~self.attacking[:n] & ~self.falling[:n]
+        self.direction[:n][turn] *= -1
+        return hit
+
+    #Monster.move
+    def _move(self, which, wall):
+        self._turn(which, wall)
+        self.x[:self.size][which] += self.direction[:self.size][which]
+
+    #GroundMonster.jump
+    def _jump(self, which, wall):
+        n = self.size
+        proto = self.prototype
+        up = which & (self.jump_count[:n] < proto.jump_limit)
+        hit = self._turn(up, wall)
+        forward = up & ~hit
+        self.x[:n][forward] += proto.jump_dist_x * self.direction[:n][forward]
+        self.y[:n][up] -= proto.jump_dist_y
+        self.jump_count[:n][up] += 1
+        end = which & ~up
+        self.jumping[:n][end] = False
+        self.falling[:n][end] = True
+
+    #GroundMonster.fall
+    def _fall(self, which, wall, ground):
+        n = self.size
+        attack_fall = which & self.attacking[:n] & (self.jump_count[:n] > 0)
+        air = which & ~attack_fall & ~ground
+        landed = which & ~attack_fall & ~air
+        self.attacking[:n][air] = False
+        self._fail(attack_fall | air, wall)
+        self.jump_count[:n][attack_fall] -= 1
+        self.jump_count[:n][landed] = 0
+        self.falling[:n][landed] = False
+
+    #GroundMonster._fail
+    def _fail(self, which, wall):
+        n = self.size
+        proto = self.prototype
+        hit = self._turn(which, wall)
+        forward = which & ~hit
+        self.x[:n][forward] += proto.jump_dist_x * self.direction[:n][forward]
+        self.y[:n][which] += proto.jump_dist_y * self.fail_speed[:n][which]
+
+    #removes the monsters in which (a bool array) with a stable compaction: the monsters kept move down
+    #to fill the gaps in the same order, so the update and draw order (and the state hash) stay the same
+    def remove(self, which):
+        keep = np.flatnonzero(~which[:self.size])
+        if len(keep) == self.size:
+            return
+        for field in FIELDS:
+            array = getattr(self, field)
+            array[:len(keep)] = array[keep]
+            if FIELDS[field] is object:
+                array[len(keep):self.size] = None
+        self.size = len(keep)
+
+    #shifts every monster when the camera moves
+    def shift(self, movement):
+        self.x[:self.size] -= movement
+
+    #x, y, direction, dying and attacking of every monster packed like Game.state_hash packs a monster
+    def state_bytes(self):
+        n = self.size
+        packed = np.empty(n, np.dtype([("x", "<f8"), ("y", "<f8"), ("direction", "i1"), ("dying", "?"),
+                                       ("attacking", "?")]))
+        packed["x"] = self.x[:n]
+        packed["y"] = self.y[:n]
+        packed["direction"] = self.direction[:n]
+        packed["dying"] = self.dying[:n]
+        packed["attacking"] = self.attacking[:n]
+        return packed.tobytes()
@@ -1,14 +1,13 @@
 import random
-import time
-
-import pygame
 
 from models.fsm import Transition, Move, Attack, Jump, Fall, Dead, Event, Dying, FSM, MoveInAir
 from models.player import Player
+from models.timestep import GameClock
 from models.wave import Wave, Waves
 from models.world import World
 
 STATES = [Move, Attack, Jump, Fall, Dead]
+SPAWN_TRIES = 32  # spots tried before giving up on spawning a monster
 
 
 class Monster:
@@ -40,22 +39,31 @@ class Monster:
         self.stop_width = stop_width
         self.start_height = start_height
         self.stop_height = stop_height
+        self.jump_limit = jump_limit  # max number of UP actions per each jump
+        self.jump_dist_x = jump_dist_x
+        self.jump_dist_y = jump_dist_y
+        self.attack_prob = attack_prob
+        self.cry_prob = cry_prob
+        self.offset = 1
+        self.fsm: FSM  # made by the subclasses before calling this
+        self.reset()
+
+    def reset(self):
+        # start a new life: a new id, the first state of the FSM and a new spawn position
+        # the Spawner calls it to reuse a dead monster instead of making a new one
+        # returns False when no free spot was found
         self.direction = random.choice([-1, 1])
         self.dying = False
         self.is_dead = False
         self.attacking = False
         self.jump_count = 0  # number of UP actions done for a jump
-        self.jump_limit = jump_limit  # max number of UP actions per each jump
         self.jumping = False  # is jumping
-        self.jump_dist_x = jump_dist_x
-        self.jump_dist_y = jump_dist_y
         self.falling = False  # is falling
-        self.attack_prob = attack_prob
-        self.cry_prob = cry_prob
         self.id = self._get_id()
-        self.offset = 1
-        self.fsm: FSM
-        self.spawn()
+        self.contacts = None
+        self.fsm.reset()
+        self.spawned = self.spawn() is not None
+        return self.spawned
 
     def update(self, **kwargs):
         self.sprite = kwargs['sprite']
@@ -116,7 +124,8 @@ class Monster:
         self.attacking = False
 
     def spawn(self):
-        # clone method
+        # pick a random spot away from the player and out of the walls, trying at most SPAWN_TRIES spots
+        # returns None when none was free (the monster stays on the last spot tried)
         if not Monster.USER_POS:
             self.pos = [
                 random.randrange(self.stop_width - 16 * 15, self.stop_width),
@@ -124,7 +133,7 @@ class Monster:
             ]
             return self.pos
 
-        while True:
+        for _ in range(SPAWN_TRIES):
             self.pos = [
                 random.randrange(self.stop_width - 16 * 8, self.stop_width),
                 random.randrange(self.start_height, self.stop_height),
@@ -135,6 +144,7 @@ class Monster:
                 if self.check_inside_walls():
                     continue
                 return self.pos
+        return None
 
     def out_of_world(self):
         # check if the monster is out of the world
@@ -143,15 +153,15 @@ class Monster:
     def turn_dirc_if_hit_wall(self):
         # Invert the monster's direction if it hits a wall
 
-        blocks = World.get_or_create().get_blocks()
-        for b in blocks:
-            self.sprite.rect.x += self.offset * self.direction
-            if pygame.sprite.collide_mask(b, self.sprite):
-                self.sprite.rect.x -= self.offset * self.direction
-                if not self.attacking and not self.falling:
-                    self.direction *= -1
-                return True
-            self.sprite.rect.x -= self.offset * self.direction
+        contacts = self.get_contacts()
+        if contacts:
+            hit_wall = contacts.wall
+        else:
+            hit_wall = World.get_or_create().collision.wall_ahead(self.sprite, self.offset * self.direction)
+        if hit_wall:
+            if not self.attacking and not self.falling:
+                self.direction *= -1
+            return True
 
     def check_inside_walls(self):
         # check if the monster is inside of the walls
@@ -164,18 +174,20 @@ class Monster:
     def step_on_wall(self):
         # check if the monster steps on a wall
 
-        blocks = World.get_or_create().get_blocks()
-        for b in blocks:
-            self.sprite.rect.y += 5
-            if pygame.sprite.collide_mask(b, self.sprite):
-                self.sprite.rect.x -= 5 * self.direction
-                self.sprite.rect.y -= 5
-                if pygame.sprite.collide_mask(b, self.sprite):
-                    self.sprite.rect.x += 5 * self.direction
-                    continue
-                self.sprite.rect.x += 5 * self.direction
-                return True
-            self.sprite.rect.y -= 5
+        contacts = self.get_contacts()
+        if contacts and contacts.ground is not None:
+            return contacts.ground
+        return World.get_or_create().collision.ground_under(self.sprite, self.direction)
+
+    def set_contacts(self, contacts):
+        # block contacts computed for the whole sprite in one batch (see MonsterSprite.update)
+        # they are only valid while the monster keeps the same direction
+        self.contacts = (self.direction, contacts) if contacts else None
+
+    def get_contacts(self):
+        if self.contacts and self.contacts[0] == self.direction:
+            return self.contacts[1]
+        return None
 
     @classmethod
     def get_sprite(cls):
@@ -220,10 +232,10 @@ class BirdLike(Monster):
     def __init__(self, width, height, start_width=0, stop_width=0, start_height=0,
                  stop_height=0, jump_limit=7, jump_dist_x=7,
                  jump_dist_y=1, attack_prob=0.05, cry_prob=0.01):
+        self.fsm = FSM(STATES, Monster.TRANSITIONS)
         super().__init__(width, height, start_width, stop_width, start_height, stop_height, jump_limit, jump_dist_x,
                          jump_dist_y,
                          attack_prob, cry_prob)
-        self.fsm = FSM(STATES, Monster.TRANSITIONS)
 
     def dead(self):
         self.is_dead = True
@@ -281,12 +293,15 @@ class GroundMonster(Monster):
     def __init__(self, width, height, start_width=0, stop_width=0, start_height=0,
                  stop_height=0, jump_limit=7, jump_dist_x=7,
                  jump_dist_y=1, attack_prob=0.05, cry_prob=0.05):
+        self.fsm = FSM(STATES, GroundMonster.TRANSITIONS)
         super(GroundMonster, self).__init__(width, height, start_width, stop_width, start_height, stop_height,
                                             jump_limit,
                                             jump_dist_x,
                                             jump_dist_y, attack_prob, cry_prob)
-        self.fsm = FSM(STATES, GroundMonster.TRANSITIONS)
+
+    def reset(self):
         self.fail_speed = 1
+        return super(GroundMonster, self).reset()
 
     def update(self, **kwargs):
         super(GroundMonster, self).update(**kwargs)
@@ -320,14 +335,14 @@ class GroundMonster(Monster):
         self.fsm.update(event, self)
 
     def spawn(self):
-        self.pos = [super(GroundMonster, self).spawn()[0], self.stop_height]
-        offset = 0
-        while True:
-            if self.check_inside_walls():
-                self.pos = [self.pos[0], self.stop_height + offset]
-                offset -= 16
-                continue
-            return self.pos
+        # on the blocks under a free spot, going up 16 pixels at a time until it is out of the walls
+        if super(GroundMonster, self).spawn() is None:
+            return None
+        for offset in range(0, -16 * SPAWN_TRIES, -16):
+            self.pos = [self.pos[0], self.stop_height + offset]
+            if not self.check_inside_walls():
+                return self.pos
+        return None
 
     def jump(self, **kwargs):
         old_pos = self.pos
@@ -427,16 +442,20 @@ class Whale(Monster):
                  jump_limit=7,
                  jump_dist_x=7,
                  jump_dist_y=1, attack_prob=0.05):
+        self.attack_interval = attack_interval
+        self.fsm = FSM(STATES, Monster.TRANSITIONS)
         super().__init__(width, height, start_width, stop_width, start_height, stop_height, jump_limit, jump_dist_x,
                          jump_dist_y,
                          attack_prob)
-        self.attack_interval = attack_interval
+
+    def reset(self):
+        spawned = super(Whale, self).reset()
         self.direction = -1
-        self.fsm = FSM(STATES, Monster.TRANSITIONS)
         self.attack_info = {'time': 1 << 31,
                             'finished': 0,
                             'wave': None,
                             'wait': random.randint(1, self.attack_interval)}
+        return spawned
 
     def out_of_world(self):
         return self.x < -100 or self.x > self.width or self.y > self.height or self.y < 0
@@ -445,8 +464,8 @@ class Whale(Monster):
         if not self.attacking:
             whale_attack = self.attack_info
             super(Whale, self).attack()
-            if whale_attack['finished'] == 0 or time.time() - whale_attack['finished'] >= whale_attack['wait']:
-                whale_attack['time'] = time.time()
+            if whale_attack['finished'] == 0 or GameClock.now() - whale_attack['finished'] >= whale_attack['wait']:
+                whale_attack['time'] = GameClock.now()
                 wave = Wave([self.x + (self.x / 4), 3.5 * self.y], 1, 144,
                             [0, whale_attack['wait'] / 2])
                 Waves.get_or_create().add_wave(wave)
@@ -457,13 +476,13 @@ class Whale(Monster):
         event = None
         if self.out_of_world():
             event = Event.DEAD
-        elif self.fsm.current == Attack and time.time() - self.attack_info['time'] >= self.attack_interval:
+        elif self.fsm.current == Attack and GameClock.now() - self.attack_info['time'] >= self.attack_interval:
             event = Event.MOVE
             self.attacking = False
             Whale.SPRITE.change_monster_state(self)
         elif self.fsm.current == Move and self.want_attack():
             event = Event.ATTACK
-            self.attack_info['time'] = time.time()
+            self.attack_info['time'] = GameClock.now()
 
         self.fsm.update(event, self)
 
@@ -488,5 +507,37 @@ class Whale(Monster):
     SPRITE = None
 
 class Spawner:
+    # makes the monsters of the game from the prototypes
+    # the dead monsters come back here (MonsterSprite._remove_monster) and are reset for the next spawn
+    # of their type instead of cloning the prototype, so a long game stops making new monsters
+
+    _singleton = None
+
+    def __init__(self):
+        self.free = {}  # type of monster -> dead monsters ready to be reset
+        self.failed = 0  # spawns without a free spot
+        Spawner._singleton = self
+
     def spawn_monster(self, prototype) -> Monster:
-        return prototype.clone()
+        # a monster of the prototype's type, None if it found no free spot
+        free = self.free.get(type(prototype))
+        if free:
+            monster = free.pop()
+            monster.reset()
+        else:
+            monster = prototype.clone()
+        if not monster.spawned:
+            self.failed += 1
+            self.recycle(monster)
+            return None
+        return monster
+
+    def recycle(self, monster):
+        self.free.setdefault(type(monster), []).append(monster)
+
+    #initiate or get an existing singleton
+    @staticmethod
+    def get_or_create(**kwargs):
+        if Spawner._singleton:
+            return Spawner._singleton
+        return Spawner(**kwargs)
@@ -0,0 +1,144 @@
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import datetime
+
+from models.game import Inputs
+from models.timestep import GameClock
+
+#a replay is the seed and difficulty of a game and the keys held at every tick
+#with the state hash of every tick to check that the replay plays the same game
+#the mode of the game (the stress mode and its number of monsters) is in the header too
+#so a replay is played in the mode it was recorded in, whatever WAVEBORN_STRESS is
+#layout (little endian):
+# header - magic, version, difficulty, tick rate, seed, number of ticks, flags, monsters of the stress mode
+# inputs - zlib compressed, one byte per tick (bit 0 left, bit 1 right, bit 2 jump, bit 3 no key pressed yet)
+# hashes - zlib compressed, one uint32 per tick
+REPLAY_MAGIC = b"WBRP"
+REPLAY_VERSION = 2
+HEADER = struct.Struct("<4sHBHQIBI")
+STRESS_FLAG = 1  # flags bit of a game played in the stress mode
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+NO_INPUT = 8
+REPLAY_DIR = os.environ.get("WAVEBORN_RECORD", "")
+
+
+def encode_inputs(inputs):
+    if inputs is None:
+        return NO_INPUT
+    return (LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) | (JUMP if inputs.jump else 0)
+
+
+def decode_inputs(bits):
+    if bits & NO_INPUT:
+        return None
+    return Inputs(bool(bits & LEFT), bool(bits & RIGHT), bool(bits & JUMP))
+
+
+class Replay:
+    def __init__(self, seed, difficulty, tick_rate, inputs=None, hashes=None, stress=0):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.tick_rate = tick_rate
+        self.stress = stress
+        self.inputs = inputs if inputs is not None else bytearray()
+        self.hashes = hashes if hashes is not None else array("I")
+
+    def __len__(self):
+        return len(self.inputs)
+
+    #records a tick (called after Game.step)
+    def record(self, inputs, state_hash):
+        self.inputs.append(encode_inputs(inputs))
+        self.hashes.append(state_hash)
+
+    def save(self, file_path):
+        hashes = array("I", self.hashes)
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        inputs = zlib.compress(bytes(self.inputs), 9)
+        with open(file_path, "wb") as outfile:
+            outfile.write(HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.difficulty, self.tick_rate,
+                                      self.seed, len(self.inputs), STRESS_FLAG if self.stress else 0,
+                                      self.stress))
+            outfile.write(struct.pack("<I", len(inputs)))
+            outfile.write(inputs)
+            outfile.write(zlib.compress(hashes.tobytes(), 9))
+        return file_path
+
+    @staticmethod
+    def load(file_path):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size or data[:4] != REPLAY_MAGIC or \
+                struct.unpack_from("<H", data, 4)[0] != REPLAY_VERSION:
+            raise ValueError(f"{file_path} is not a replay of version {REPLAY_VERSION}")
+        magic, version, difficulty, tick_rate, seed, ticks, flags, stress = HEADER.unpack_from(data, 0)
+        start = HEADER.size + 4
+        (inputs_size,) = struct.unpack_from("<I", data, HEADER.size)
+        inputs = bytearray(zlib.decompress(data[start:start + inputs_size]))
+        hashes = array("I", zlib.decompress(data[start + inputs_size:]))
+        if sys.byteorder == "big":
+            hashes.byteswap()
+        if len(inputs) != ticks or len(hashes) != ticks:
+            raise ValueError(f"{file_path} is truncated")
+        return Replay(seed, difficulty, tick_rate, inputs, hashes, stress if flags & STRESS_FLAG else 0)
+
+    #the file name of a new replay in a directory
+    @staticmethod
+    def new_path(directory, seed):
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{datetime.now():%Y%m%d_%H%M%S}_{seed}.wbr")
+
+
+#plays a replay on a game (without drawing) as fast as possible
+#with check it compares the state hash of every tick and stops at the first one that is different
+#the game is switched to the mode of the replay (game.stress)
+#returns (ticks played, seconds, first different tick or None)
+def run_replay(game, replay, check=True):
+    game.stress = replay.stress
+    game.reset(replay.seed, replay.difficulty)
+    GameClock.reset(replay.tick_rate)
+    start = time.perf_counter()
+    for tick, bits in enumerate(replay.inputs):
+        game.step(decode_inputs(bits))
+        if check and game.state_hash() != replay.hashes[tick]:
+            return tick + 1, time.perf_counter() - start, tick
+    return len(replay), time.perf_counter() - start, None
+
+
+#replay runner: python -m models.replay file.wbr [--no-check] [--repeat N]
+if __name__ == "__main__":
+    import argparse
+
+    import pygame
+
+    from models.game import Game
+
+    parser = argparse.ArgumentParser(description="plays Wave-Born replays without a window")
+    parser.add_argument("replays", nargs="+")
+    parser.add_argument("--no-check", action="store_true", help="don't compare the state hashes")
+    parser.add_argument("--repeat", type=int, default=1, help="times to play each replay")
+    args = parser.parse_args()
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1024, 640))
+    game = Game()
+    failed = False
+    for file_path in args.replays:
+        replay = Replay.load(file_path)
+        for _ in range(args.repeat):
+            ticks, elapsed, mismatch = run_replay(game, replay, not args.no_check)
+            status = "ok" if mismatch is None else f"differs at tick {mismatch}"
+            failed |= mismatch is not None
+            print(f"{file_path}: {ticks}/{len(replay)} ticks in {elapsed:.2f}s "
+                  f"({ticks / max(elapsed, 1e-9):.0f} ticks/s), result {game.result}, {status}")
+    pygame.quit()
+    sys.exit(1 if failed else 0)
@@ -1,45 +1,156 @@
+import math
+import os
+
 from pygame import mixer
 from pygame.mixer import *
 
+from models.audio_cache import AUDIO_CACHE_DIR, AudioCache
+
+#priorities of the sounds, a sound can take the channel of a sound of lower priority
+#or of a sound of the same priority that is farther from the player
+PLAYER = 2
+WHALE = 1
+CREATURE = 0  # birds and turtles
+VOICES = int(os.environ.get("WAVEBORN_VOICES", 8))
+
+
+class SoundBank:
+    # decoded sounds of the game, every file is decoded once and shared by all its Sound handles
+    # the decoded samples are kept on disk (see AudioCache) so only the first run decodes the mp3 files
+    # disk is None to not use the disk cache (WAVEBORN_AUDIO_CACHE empty)
+
+    _singleton = None
+
+    def __init__(self, disk_dir=AUDIO_CACHE_DIR):
+        self.disk = AudioCache(disk_dir) if disk_dir else None
+        self.buffers = {}
+        SoundBank._singleton = self
+
+    def get(self, file):
+        # decoded sound of a file (decoded the first time)
+        buffer = self.buffers.get(file)
+        if buffer is None:
+            buffer = self.disk.load(file) if self.disk else None
+            if buffer is None:
+                buffer = mixer.Sound(file)
+                if self.disk:
+                    self.disk.save(file, buffer)
+            self.buffers[file] = buffer
+        return buffer
+
+    def music(self, file):
+        # file to stream a music from (a decoded copy if it can), None if the music doesn't exist
+        if self.disk:
+            return self.disk.music(file)
+        return file if os.path.exists(file) else None
+
+    def preload(self, *files):
+        # decode the sounds before they are needed so spawning a monster doesn't read the disk
+        for file in files:
+            self.get(file)
+
+    #initiate or get an existing singleton
+    @staticmethod
+    def get_or_create(**kwargs):
+        if SoundBank._singleton:
+            return SoundBank._singleton
+        return SoundBank(**kwargs)
+
+
+class VoicePool:
+    # the only mixer channels the sounds play on, so there are never more than "voices" sounds playing
+    # when every channel is busy a new sound takes the channel of the least important sound:
+    # the lowest priority and then the farthest from the listener (the player)
+    # if every playing sound is more important the new sound is not played
+
+    _singleton = None
 
-class Sound(mixer.Sound):
-    # class that encapsulates mixer.Sound
+    def __init__(self, voices=VOICES):
+        mixer.set_num_channels(voices)
+        self.channels = [mixer.Channel(idx) for idx in range(voices)]
+        self.owners = [None] * voices
+        self.listener = None
+        self.stolen = 0
+        self.dropped = 0
+        VoicePool._singleton = self
 
-    _all_sounds = set() # all created sounds
-    _ID = 0
+    def distance(self, position):
+        # sounds without a position are the player's own sounds
+        if position is None or self.listener is None:
+            return 0
+        return math.hypot(position[0] - self.listener[0], position[1] - self.listener[1])
 
-    def __init__(self, file):
-        super(Sound, self).__init__(file)
-        self.id = self._next_id()
-        Sound._all_sounds.add(self)
+    def play(self, sound, position=None, **kwargs):
+        distance = self.distance(position)
+        idx = self._free_channel()
+        if idx is None:
+            idx = self._weakest_channel()
+            owner = self.owners[idx]
+            if (owner.priority, -owner.distance) >= (sound.priority, -distance):
+                self.dropped += 1
+                return None
+            self.stolen += 1
+        if self.owners[idx]:
+            self.owners[idx].channel = None
 
-    def play(self, **kwargs):
+        channel = self.channels[idx]
+        channel.play(sound.buffer, **kwargs)
+        channel.set_volume(music.get_volume())
+        self.owners[idx] = sound
+        sound.distance = distance
+        return idx
+
+    def stop(self, sound):
+        idx = sound.channel
+        if idx is not None and self.owners[idx] is sound:
+            self.channels[idx].stop()
+            self.owners[idx] = None
+
+    def stop_all(self):
+        for idx, channel in enumerate(self.channels):
+            channel.stop()
+            if self.owners[idx]:
+                self.owners[idx].channel = None
+            self.owners[idx] = None
+
+    def _free_channel(self):
+        for idx, channel in enumerate(self.channels):
+            if self.owners[idx] is None or not channel.get_busy():
+                return idx
+        return None
+
+    def _weakest_channel(self):
+        return min(range(len(self.channels)), key=lambda idx: (self.owners[idx].priority, -self.owners[idx].distance))
+
+    #initiate or get an existing singleton
+    @staticmethod
+    def get_or_create(**kwargs):
+        if VoicePool._singleton:
+            return VoicePool._singleton
+        return VoicePool(**kwargs)
+
+
+class Sound:
+    # handle of a sound of the SoundBank, played on a channel of the VoicePool
+    # a handle only stops its own channel so many monsters can play the same sound
+
+    def __init__(self, file, priority=CREATURE):
+        self.buffer = SoundBank.get_or_create().get(file)
+        self.priority = priority
+        self.channel = None
+        self.distance = 0
+
+    def play(self, position=None, **kwargs):
         # when starts
         self.stop()
-        self.set_volume(music.get_volume())
-        super(Sound, self).play(**kwargs)
+        self.channel = VoicePool.get_or_create().play(self, position, **kwargs)
+
+    def stop(self):
+        if self.channel is not None:
+            VoicePool.get_or_create().stop(self)
+        self.channel = None
 
     @classmethod
     def stop_all_sounds(cls):
         # stop all sounds when the game finished
-        for s in Sound._all_sounds:
-            s.stop()
-        Sound._all_sounds.clear()
-
-    @classmethod
-    def pop_sound(cls, id):
-        # when a monster dies remove its sound
-        Sound._all_sounds.remove(id)
-
-    def __hash__(self):
-        return self.id
-
-    def __eq__(self, other):
-        if isinstance(other, int):
-            return self.id == other
-        return self.id == other.id
-
-    def _next_id(self):
-        id = Sound._ID
-        Sound._ID = id + 1
-        return id
+        VoicePool.get_or_create().stop_all()
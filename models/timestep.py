@@ -0,0 +1,101 @@
+import os
+import time
+
+#the game is simulated in ticks of fixed length, every speed in the game (jumps, monster steps, waves, animations)
+#is in pixels or frames per tick so the tick rate is the speed of the game (144 is the speed it was made for)
+#the screen is drawn as often as FRAME_RATE allows (0 is as fast as possible) running the ticks that are due
+TICK_RATE = int(os.environ.get("WAVEBORN_TICK_RATE", 144))
+FRAME_RATE = int(os.environ.get("WAVEBORN_FPS", 144))
+
+
+#fixed timestep accumulator
+#advance adds the real time since the last call and returns how many ticks have to run
+#alpha is how far the game is between the last tick and the next one (used to interpolate when drawing)
+#when the game falls more than max_lag seconds behind (slow machine, window dragged) that time is dropped
+#so it slows down instead of running hundreds of ticks to catch up
+class FixedTimestep:
+    def __init__(self, tick_rate=TICK_RATE, max_lag=0.25):
+        self.tick_rate = tick_rate
+        self.dt = 1 / tick_rate
+        self.max_lag = max_lag
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+        self.ticks = 0
+        self.dropped = 0.0
+
+    #starts counting from now (after a menu or a loading screen)
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+
+    def advance(self):
+        now = time.perf_counter()
+        self.accumulator += now - self.last_time
+        self.last_time = now
+        if self.accumulator > self.max_lag:
+            self.dropped += self.accumulator - self.max_lag
+            self.accumulator = self.max_lag
+        ticks = int(self.accumulator / self.dt)
+        self.accumulator -= ticks * self.dt
+        self.ticks += ticks
+        return ticks
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
+
+
+#moves rects between their position in the last tick and the current one while the screen is drawn
+#snapshot is called at the start of every tick with (key, rect) pairs of everything that is drawn
+#and apply(alpha) puts each rect at previous + alpha * (current - previous) until restore is called
+#rects that weren't in the last snapshot (new chunks, new monsters) are drawn where they are
+class Interpolation:
+    def __init__(self):
+        self.previous = {}
+        self.moved = []
+
+    def snapshot(self, rects):
+        self.previous = {key: rect.topleft for key, rect in rects}
+
+    def apply(self, rects, alpha):
+        self.moved = []
+        if alpha >= 1.0:
+            return
+        moving = set()
+        for key, rect in rects:
+            previous = self.previous.get(key)
+            if previous is None or previous == rect.topleft or id(rect) in moving:
+                continue
+            moving.add(id(rect))
+            x, y = rect.topleft
+            self.moved.append((rect, (x, y)))
+            rect.topleft = (round(previous[0] + alpha * (x - previous[0])),
+                            round(previous[1] + alpha * (y - previous[1])))
+
+    def restore(self):
+        for rect, position in reversed(self.moved):
+            rect.topleft = position
+        self.moved = []
+
+
+#time of the game in seconds counted in ticks
+#the monsters and the world timer use it instead of the real time so a game plays the same
+#at any speed (a replay run as fast as possible, a slow machine) and stops while the menu is open
+class GameClock:
+    TICK_RATE = TICK_RATE
+    ticks = 0
+
+    #starts the clock of a new game
+    @staticmethod
+    def reset(tick_rate=TICK_RATE):
+        GameClock.TICK_RATE = tick_rate
+        GameClock.ticks = 0
+
+    #called once at the start of every tick
+    @staticmethod
+    def tick():
+        GameClock.ticks += 1
+
+    @staticmethod
+    def now():
+        return GameClock.ticks / GameClock.TICK_RATE
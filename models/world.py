@@ -1,11 +1,19 @@
-from models.block import Chunk
+from models.block import Chunk, PlacedChunk
+from models.chunk_pack import ChunkPack, CHUNK_PACK_PATH, CHUNK_DIRS
+from models.collision import CollisionWorld
+from models.timestep import GameClock
 from os import listdir
 from os.path import isfile, join
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import random
-import copy
+import threading
 import pygame
 from sprites.chunk_sprites import BlockSprite
 
+NORMAL_POOL = 0
+TUNNEL_POOL = 1
+
 #This method will get all possible chunks that can be generated from a list
 # "chunk_list" (its a list of possible chunks) based on the parameters of the "prev_chunk"
 # the chunk that wants to generate a new one based on a order "check_order"
@@ -20,6 +28,162 @@ def getPossibleChunks(chunk_list, prev_chunk, check_order):
             return selected_chunk
     return None
 
+#index of which chunks can come after each chunk, it is built once when the chunk files are loaded
+#because the requisits of the chunks never change, so generating a world doesn't have to check them again
+#pools is a list of lists of chunks (normal and tunnel chunks) and weight gives how likely a chunk is picked
+#for every chunk it keeps, per pool, the chunks that can be generated after it and their cumulative weights
+class ChunkCompatibilityIndex:
+    def __init__(self, pools, weight=lambda chunk: 1):
+        self.pools = pools
+        self.weight = weight
+        self.next_chunks = {}
+        for pool in pools:
+            for prev_chunk in pool:
+                self.add(prev_chunk)
+
+    #adds the chunks that can be generated after prev_chunk to the index
+    def add(self, prev_chunk):
+        if prev_chunk in self.next_chunks:
+            return
+        self.next_chunks[prev_chunk] = []
+        for pool in self.pools:
+            possible = [chunk for chunk in pool if chunk.can_be_generated(prev_chunk.post_requisits)]
+            cum_weights = []
+            total = 0
+            for chunk in possible:
+                total += self.weight(chunk)
+                cum_weights.append(total)
+            self.next_chunks[prev_chunk].append((possible, cum_weights))
+
+    #all the chunks of a pool that can be generated after prev_chunk
+    def possible_chunks(self, prev_chunk, pool):
+        self.add(prev_chunk)
+        return self.next_chunks[prev_chunk][pool][0]
+
+    #picks a random chunk of a pool that can be generated after prev_chunk (None if there is none)
+    def pick(self, prev_chunk, pool, rng=random):
+        self.add(prev_chunk)
+        possible, cum_weights = self.next_chunks[prev_chunk][pool]
+        if not possible:
+            return None
+        return rng.choices(possible, cum_weights=cum_weights)[0]
+
+#the chunks of a generated world, computed on demand from the world seed instead of being stored
+#the chunk in position i only depends on (seed, i) and the chunk before it so the layout keeps the chunk
+#of every "checkpoint_interval" positions and rebuilds any other chunk from the closest checkpoint before it
+#the same seed always gives the same world and the memory used doesn't grow with the world
+#it works like a list of PlacedChunk (world_chunks[i] and len(world_chunks))
+class WorldLayout:
+    def __init__(self, compatibility, start_end_chunk, num_chunks, seed, chunk_width,
+                 checkpoint_interval=64, cache_size=16):
+        self.compatibility = compatibility
+        self.start_end_chunk = start_end_chunk
+        self.num_chunks = num_chunks
+        self.seed = seed
+        self.chunk_width = chunk_width
+        self.checkpoint_interval = checkpoint_interval
+        self.cache_size = cache_size
+        self.placed = OrderedDict()
+        self.lock = threading.Lock()
+
+        # walk the world once to store the checkpoints and check that it can be generated
+        self.checkpoints = []
+        template = start_end_chunk
+        for pos in range(num_chunks - 1):
+            if pos > 0:
+                template = self.next_template(template, pos)
+                if not template:
+                    raise ValueError("Not possible to generate chunks given all possibilities")
+            if pos % checkpoint_interval == 0:
+                self.checkpoints.append(template)
+
+        self.end_chunk = PlacedChunk(start_end_chunk, (num_chunks - 1) * chunk_width)
+        self.end_chunk.end_chunk()
+
+    #random generator of a position, it only depends on the world seed and the position
+    def rng(self, pos):
+        return random.Random(f"{self.seed}:{pos}")
+
+    #the template of the chunk in position pos given the template of the chunk before it
+    def next_template(self, prev_template, pos):
+        rng = self.rng(pos)
+        if (prev_template.tunnel and rng.randint(0, 10)):
+            next_chunk = self.compatibility.pick(prev_template, TUNNEL_POOL, rng)
+            if (next_chunk):
+                return next_chunk
+        return self.compatibility.pick(prev_template, NORMAL_POOL, rng)
+
+    #the template of the chunk in position pos, rebuilt from the closest checkpoint
+    def template(self, pos):
+        if pos == self.num_chunks - 1:
+            return self.start_end_chunk
+        checkpoint = pos // self.checkpoint_interval
+        template = self.checkpoints[checkpoint]
+        for next_pos in range(checkpoint * self.checkpoint_interval + 1, pos + 1):
+            template = self.next_template(template, next_pos)
+        return template
+
+    def __len__(self):
+        return self.num_chunks
+
+    #the placed chunk in position pos, the last used ones are kept so they aren't rebuilt every time
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += self.num_chunks
+        if pos < 0 or pos >= self.num_chunks:
+            raise IndexError("world chunk position out of range")
+        if pos == self.num_chunks - 1:
+            return self.end_chunk
+
+        with self.lock:
+            if pos in self.placed:
+                self.placed.move_to_end(pos)
+                return self.placed[pos]
+            chunk = PlacedChunk(self.template(pos), pos * self.chunk_width)
+            self.placed[pos] = chunk
+            if len(self.placed) > self.cache_size:
+                self.placed.popitem(last=False)
+            return chunk
+
+#builds the sprites of the chunks that are about to be loaded on a worker thread
+#so crossing a chunk boundary only has to swap in a sprite that is already built
+#build is a function that receives a chunk position and returns its BlockSprite
+#prefetched and synchronous count how many loads were served by the worker or had to be built on the spot
+class ChunkPrefetcher:
+    def __init__(self, build):
+        self.build = build
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunk-prefetch")
+        self.pending = {}
+        self.prefetched = 0
+        self.synchronous = 0
+
+    #start building the sprites of the given chunk positions (first ones first)
+    #and forget the ones that are not going to be needed
+    def prefetch(self, positions):
+        for pos in list(self.pending):
+            if pos not in positions:
+                self.pending.pop(pos).cancel()
+        for pos in positions:
+            if pos not in self.pending:
+                self.pending[pos] = self.executor.submit(self.build, pos)
+
+    #get the sprite of a chunk position, if the worker didn't finish it yet it is built right now
+    def take(self, pos):
+        future = self.pending.pop(pos, None)
+        if future and future.done() and not future.cancelled() and not future.exception():
+            self.prefetched += 1
+            return future.result()
+        if future:
+            future.cancel()
+        self.synchronous += 1
+        return self.build(pos)
+
+    #forget every sprite being built (used when a new world is generated)
+    def clear(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+
 #world class is a singleton that represents the world
 class World:
     _singleton = None
@@ -32,21 +196,35 @@ class World:
         self.SCALE = SCALE
         
         self.file_chunks = self.loadFiles()
+        self.compatibility = ChunkCompatibilityIndex(self.file_chunks)
+        self.prefetcher = ChunkPrefetcher(self.buildChunkSprite)
+        self.collision = CollisionWorld(SCALE, 5 * 16, blocks_y + 1)
         
         World._singleton = self
 
-    #will load files from 2 paths where it can be a normal chunk or a tunnel chunk
+    #will load the chunks from the chunk pack (compiled from the normal and tunnel chunk folders)
     #this after preloading all the files will store them for future use so we can generate worlds
-    #extremely fast
+    #extremely fast, the blocks of each chunk are only decoded when the chunk is first used
     def loadFiles(self):
+        try:
+            self.chunk_pack = ChunkPack.load_or_build(CHUNK_PACK_PATH, CHUNK_DIRS)
+        except (OSError, ValueError):
+            return self.loadJsonFiles()
+        self.start_end_chunk = self.chunk_pack.find("normal", "plane")
+        return (self.chunk_pack.group("normal"), self.chunk_pack.group("tunnel"))
+
+    #will load files from 2 paths where it can be a normal chunk or a tunnel chunk
+    #used when the chunk pack can't be built, the files are read in the order of the pack (sorted)
+    #so a seed generates the same world with or without the pack
+    def loadJsonFiles(self):
         self.start_end_chunk = Chunk.load_chunk(0, "./chunks/normal/plane")
 
         file_path = "./chunks/normal"
-        normal_chunks = [Chunk.load_chunk(0, join(file_path, f)) for f in listdir(file_path) if
+        normal_chunks = [Chunk.load_chunk(0, join(file_path, f)) for f in sorted(listdir(file_path)) if
                          isfile(join(file_path, f))]
 
         file_path = "./chunks/tunnel"
-        tunnel_chunks = [Chunk.load_chunk(0, join(file_path, f)) for f in listdir(file_path) if
+        tunnel_chunks = [Chunk.load_chunk(0, join(file_path, f)) for f in sorted(listdir(file_path)) if
                          isfile(join(file_path, f))]
         return (normal_chunks, tunnel_chunks)
 
@@ -55,61 +233,80 @@ class World:
     #time_limit will determine the size of the world
     #difficulty - int - that determines the number of monster that can be spawned on this world
     #time_limit - int - that determines the size of the world and how much time we have to complete the world
-    def generateWorld(self, difficulty, time_limit):
+    #seed - int - the world seed, the same seed always generates the same world (random if not given)
+    def generateWorld(self, difficulty, time_limit, seed=None):
         self.difficulty = difficulty
         self.time_limit = time_limit*2  # in minutes
         self.num_chunks = int((time_limit * 60) / 8)
-        self.start_timer = pygame.time.get_ticks()
+        self.start_timer = GameClock.now()
         self.font = pygame.font.SysFont('Comic Sans MS', 32)
         self.current_chunk = 0
-        self.moved = 0
+        self.camera_x = 0
+        self.collision.camera_x = 0
+        self.direction = 1
+        self.prefetcher.clear()
         self.loaded_chunks = [None, None, None, None, None]
-        self.world_chunks = []
         self.end_sprite = None
         self.num_monsters = difficulty*2 + 3
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
 
-        chunks = self.file_chunks
-        normal_qty = [idx for idx in range(len(chunks[0]))]
-        tunnel_qty = [idx for idx in range(len(chunks[1]))]
-        self.world_chunks.append(copy.deepcopy(self.start_end_chunk))
-        for pos in range(1, self.num_chunks - 1):
-            if (self.world_chunks[pos - 1].tunnel and random.randint(0, 10)):
-                random.shuffle(tunnel_qty)
-                next_chunk = getPossibleChunks(chunks[1], self.world_chunks[pos - 1], tunnel_qty)
-                if (next_chunk):
-                    self.world_chunks.append(copy.deepcopy(next_chunk))
-                    continue
-            random.shuffle(normal_qty)
-            next_chunk = getPossibleChunks(chunks[0], self.world_chunks[pos - 1], normal_qty)
-            if (next_chunk):
-                self.world_chunks.append(copy.deepcopy(next_chunk))
-                continue
-            print("Not possible to generate chunks given all possibilities")
+        try:
+            self.world_chunks = WorldLayout(self.compatibility, self.start_end_chunk, self.num_chunks,
+                                            self.seed, 16 * self.SCALE)
+        except ValueError as e:
+            print(e)
             return None
-        end_chunk = copy.deepcopy(self.start_end_chunk)
-        end_chunk.end_chunk()
-        self.world_chunks.append(end_chunk)
 
     #will start the timer of the world and start loading the chunks taht will be represented
     def startWorld(self):
-        self.start_timer = pygame.time.get_ticks()
-        for idx, chunk in enumerate(self.world_chunks):
-            chunk.update(-idx * 16 * 32)
+        self.start_timer = GameClock.now()
         for chunk in range(0, 3):
-            self.loaded_chunks[chunk + 2] = BlockSprite(self.world_chunks[chunk], self.blocks_x, self.blocks_y, self.SCALE)
-            
-    #this method moves ("move" pixels) to everychunk so that the world moves llike a conveyor belt
+            self.loaded_chunks[chunk + 2] = self.createChunkSprite(self.world_chunks[chunk])
+        self.prefetchChunks()
+        self.buildCollision()
+
+    #creates the sprite of a chunk already placed relative to the camera
+    def createChunkSprite(self, chunk):
+        chunk_sprite = BlockSprite(chunk, self.blocks_x, self.blocks_y, self.SCALE)
+        chunk_sprite.place(self.camera_x)
+        return chunk_sprite
+
+    #creates the sprite of the chunk in a position of the world (it can run on the prefetch thread)
+    def buildChunkSprite(self, pos):
+        return BlockSprite(self.world_chunks[pos], self.blocks_x, self.blocks_y, self.SCALE)
+
+    #gets the sprite of the chunk in a position of the world from the prefetcher and places it
+    def takeChunkSprite(self, pos):
+        chunk_sprite = self.prefetcher.take(pos)
+        chunk_sprite.place(self.camera_x)
+        return chunk_sprite
+
+    #asks the prefetcher for the chunks that will be loaded next and the previous ones
+    #the ones in the direction the player is going are built first
+    def prefetchChunks(self):
+        next_pos = self.current_chunk + 3
+        prev_pos = self.current_chunk - 3
+        positions = []
+        if next_pos < len(self.world_chunks):
+            positions.append(next_pos)
+        if prev_pos > 0:
+            positions.append(prev_pos)
+        if self.direction < 0:
+            positions.reverse()
+        self.prefetcher.prefetch(positions)
+
+    #this method moves the camera "move" pixels so that the world moves like a conveyor belt
+    #only the camera offset changes so it costs the same no matter how big the world is
     def moveWorld(self, move):
-        self.moved += move
-        for chunk in self.world_chunks:
-            chunk.update(move)
-    #this method moves the camera moveing the world but only the 5 chunks that are being loaded
+        self.camera_x += move
+        self.collision.camera_x = self.camera_x
+        if move:
+            self.direction = move
+    #this method places the 5 chunks that are being loaded on screen relative to the camera
     def moveCamera(self, move):
         for chunk in self.loaded_chunks:
-            try:
-                chunk.move((-move, 0))
-            except:
-                pass
+            if chunk:
+                chunk.place(self.camera_x)
     #this method will load the next chunk of the loaded chunks and return the last removed chunk and the last added chunk
     def loadNextChunk(self):
         self.current_chunk += 1
@@ -120,15 +317,19 @@ class World:
             self.loaded_chunks[chunk] = self.loaded_chunks[chunk + 1]
 
         if (new_chunk_pos < len(self.world_chunks)):
-            added = BlockSprite(self.world_chunks[new_chunk_pos],self.blocks_x,self.blocks_y,self.SCALE)
-            self.loaded_chunks[4] = added
             if new_chunk_pos == (len(self.world_chunks) - 1):
-                self.world_chunks[new_chunk_pos].end_sprite.rect.x = 128 + self.world_chunks[new_chunk_pos].x
+                self.world_chunks[new_chunk_pos].end_sprite.world_x = 128 + self.world_chunks[new_chunk_pos].x
                 self.world_chunks[new_chunk_pos].end_sprite.rect.y = 448 - 180
                 self.end_sprite = self.world_chunks[new_chunk_pos].end_sprite
+            added = self.takeChunkSprite(new_chunk_pos)
+            self.loaded_chunks[4] = added
+            self.prefetchChunks()
+            self.buildCollision()
             return removed, added
         else:
             self.loaded_chunks[4] = None
+        self.prefetchChunks()
+        self.buildCollision()
         return removed, None
     #this method will load the prev chunk of the loaded chunks and return the removed and added chunks
     def loadPrevChunk(self):
@@ -140,12 +341,20 @@ class World:
             self.loaded_chunks[chunk] = self.loaded_chunks[chunk - 1]
         
         if (new_chunk_pos > 0):
-            added = BlockSprite(self.world_chunks[new_chunk_pos],self.blocks_x,self.blocks_y,self.SCALE)
+            added = self.takeChunkSprite(new_chunk_pos)
             self.loaded_chunks[0] = added
+            self.prefetchChunks()
+            self.buildCollision()
             return removed, added
         else:
             self.loaded_chunks[0] = None
+        self.prefetchChunks()
+        self.buildCollision()
         return removed, None
+    #rebuilds the tile grid used for collisions with the blocks of the loaded chunks
+    def buildCollision(self):
+        self.collision.build(self.loaded_chunks, (self.current_chunk - 2) * 16)
+
     #this method returns all blocks that are being loaded
     def get_blocks(self) -> list[BlockSprite]:
         return [w for w in self.loaded_chunks if w]
@@ -157,7 +366,7 @@ class World:
         return cls(**kwargs)
     #see how many seconds have passed in the timer
     def get_passed_seconds(self):
-        return ((pygame.time.get_ticks()-self.start_timer)/1000)
+        return GameClock.now() - self.start_timer
     #get the remaining time as a string
     def get_passed_time_string(self):
         time_passed = self.get_passed_seconds()
@@ -0,0 +1,100 @@
+import threading
+
+import pygame
+
+from sprites.image_cache import IMAGE_CACHE_DIR, ImageCache
+from sprites.spritesheet import SpriteSheet
+
+
+#process wide cache of the images of the game
+#every sheet is decoded once and every image is cut, converted to the display pixel format, scaled and flipped once
+#images are keyed by (path, rect, scale, colorkey, alpha, flip), rect is None for a whole file
+#so the sprites of a new game only look up images that are already loaded
+#the images are shared by every sprite that uses them so nothing should draw on them
+#the chunk prefetch thread bakes blocks with it too so every lookup holds a lock
+#images that are not in memory are read from the disk cache (see ImageCache) before cutting them from the png
+#and the ones made from the png are written to it, so only the first run decodes and scales the png files
+#disk is None to not use the disk cache (WAVEBORN_IMAGE_CACHE empty)
+class Assets:
+    _singleton = None
+
+    def __init__(self, disk_dir=IMAGE_CACHE_DIR):
+        self.disk = ImageCache(disk_dir) if disk_dir else None
+        self.sheets = {}
+        self.images = {}
+        self.keys = {}  # image -> its key, to find the flipped image of an image
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        Assets._singleton = self
+
+    #the spritesheet of a file, decoded only once
+    def sheet(self, path):
+        with self.lock:
+            if path not in self.sheets:
+                self.sheets[path] = SpriteSheet(path)
+            return self.sheets[path]
+
+    #an image cut from a spritesheet
+    #colorkey is the colorkey of SpriteSheet.image_at and alpha converts it to a per pixel alpha image
+    def frame(self, path, rect, scale=None, colorkey=-1, alpha=True, flip=False):
+        return self._get((path, tuple(rect), scale and tuple(scale), colorkey, alpha, flip))
+
+    #the images of a list of rects of a spritesheet (a new list, the images are shared)
+    def frames(self, path, rects, scale=None, colorkey=-1, alpha=True, flip=False):
+        return [self.frame(path, rect, scale, colorkey, alpha, flip) for rect in rects]
+
+    #the whole image of a file converted to per pixel alpha
+    def image(self, path, scale=None, flip=False):
+        return self._get((path, None, scale and tuple(scale), None, True, flip))
+
+    #the image flipped horizontally, only images from the cache can be flipped
+    def flipped(self, image):
+        with self.lock:
+            path, rect, scale, colorkey, alpha, flip = self.keys[image]
+            return self._get((path, rect, scale, colorkey, alpha, not flip))
+
+    def _get(self, key):
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.hits += 1
+                return image
+
+            self.misses += 1
+            path, rect, scale, colorkey, alpha, flip = key
+            if self.disk:
+                image = self.disk.load(key)
+                if image is not None:
+                    self.images[key] = image
+                    self.keys[image] = key
+                    return image
+            if flip:
+                image = pygame.transform.flip(self._get(key[:-1] + (False,)), True, False)
+            else:
+                if rect is None:
+                    image = pygame.image.load(path).convert_alpha()
+                else:
+                    image = self.sheet(path).image_at(rect, colorkey)
+                    if alpha:
+                        image = image.convert_alpha()
+                if scale:
+                    image = pygame.transform.scale(image, scale)
+            if self.disk:
+                self.disk.save(key, image)
+            self.images[key] = image
+            self.keys[image] = key
+            return image
+
+    def clear(self):
+        with self.lock:
+            self.sheets.clear()
+            self.images.clear()
+            self.keys.clear()
+
+    #initiate or get an existing singleton
+    @staticmethod
+    def get_or_create(**kwargs):
+        if Assets._singleton:
+            return Assets._singleton
+        return Assets(**kwargs)
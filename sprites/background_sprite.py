@@ -1,13 +1,13 @@
 import pygame
 from pygame.sprite import Sprite
 
+from sprites.assets import Assets
+
 #this is the background sprite of the game
 class BackgroundSprite(pygame.sprite.Sprite):
     def __init__(self, leftX=0, leftY=0, width=800, height=600):
         Sprite.__init__(self)
-        picture = pygame.image.load("sources/imgs/background.png")
-        picture = pygame.transform.scale(picture, (width, height))
-        self.image = picture.convert_alpha()
+        self.image = Assets.get_or_create().image("sources/imgs/background.png", (width, height))
 
         self.rect = pygame.Rect(leftX, leftY, width - 3, height - 3)
 
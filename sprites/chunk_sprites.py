@@ -1,59 +1,106 @@
+import threading
+from collections import OrderedDict
+
 import pygame
 from pygame.sprite import Sprite
 
-from sprites.spritesheet import SpriteSheet
+from sprites.assets import Assets
 
 #this is the endsprite of the game that will be present in the last chunk
 class EndSprite(pygame.sprite.Sprite):
     def __init__(self, SCALE):
         Sprite.__init__(self)
-        END_CITY_SPRITESHEET = SpriteSheet("sources/imgs/end_city.png")
-
-        self.image = pygame.transform.scale(END_CITY_SPRITESHEET.image_at((0, 0, 160, 180), -1),
-                                            (SCALE * 5, SCALE * 5 + SCALE / 5), )
+        self.image = Assets.get_or_create().frame("sources/imgs/end_city.png", (0, 0, 160, 180),
+                                                  (SCALE * 5, SCALE * 5 + SCALE / 5), alpha=False)
 
         self.rect = self.image.get_rect()
-    #this will move the end sprite given a velocity in pixels
-    def move(self, velocity):
-        self.rect.x += velocity[0]
-        self.rect.y += velocity[1]
+        self.world_x = 0
+    #this will place the end sprite on screen given the camera position in pixels
+    def place(self, camera_x):
+        self.rect.x = self.world_x - camera_x
+
+#bounded LRU cache with the baked image and mask of each chunk template
+#the same templates repeat all over the world so a chunk is only drawn block by block
+#the first time it is loaded, after that loading a chunk is just a lookup
+#the hits and misses can be used to see how well the cache is working
+#it is also used by the chunk prefetch thread so every lookup holds a lock
+class ChunkBakeCache:
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.baked = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    #get the (image, mask, rect) of a template, the rect is relative to the start of the chunk
+    def get(self, template, SCALE):
+        key = (template, SCALE)
+        with self.lock:
+            if key in self.baked:
+                self.hits += 1
+                self.baked.move_to_end(key)
+                return self.baked[key]
+
+            self.misses += 1
+            baked = self.bake(template.blocks, SCALE)
+            self.baked[key] = baked
+            if len(self.baked) > self.capacity:
+                self.baked.popitem(last=False)
+            return baked
+
+    #get the image of a type of block (from the Assets cache)
+    def block_image(self, block_type, SCALE):
+        return Assets.get_or_create().frame("sources/imgs/blocks.png", (SCALE * block_type, 0, SCALE, SCALE),
+                                            (SCALE, SCALE), colorkey=None, alpha=False)
+
+    #draw every block of a chunk into a single image and create its mask
+    def bake(self, blocks, SCALE):
+        images = [self.block_image(block.block_type, SCALE) for block in blocks]
+
+        rects = [image.get_rect() for image in images]
+        for idx, rect in enumerate(rects):
+            rect.x = blocks[idx].x
+            rect.y = blocks[idx].y
+
+        rect = rects[0].copy()
+        for block_rect in rects[1:]:
+            rect.union_ip(block_rect)
+
+        # Create a new transparent image with the combined size.
+        image = pygame.Surface(rect.size, pygame.SRCALPHA)
+        # Now blit all sprites onto the new surface.
+        for idx, block_image in enumerate(images):
+            image.blit(block_image, (rects[idx].x - rect.left,
+                                     rects[idx].y - rect.top))
+        return image, pygame.mask.from_surface(image), rect
+
+    def clear(self):
+        with self.lock:
+            self.baked.clear()
+
 
 #this is a blocksprite but in fact it should be called chunksprite
 #because this sprite represents a chunk it has a chunk and the blocks textures
 #and will draw every block that this chunk has as a single sprite
+#the image and mask are shared by every chunk of the same template (see ChunkBakeCache)
 class BlockSprite(pygame.sprite.Sprite):
+    BAKE_CACHE = ChunkBakeCache()
+
     def __init__(self, chunk, blocks_x, blocks_y, SCALE):
         Sprite.__init__(self)
-        BLOCK_SPRITESHEET = SpriteSheet("sources/imgs/blocks.png")
         self.chunk = chunk
         self.blocks = self.chunk.blocks
 
-        images = [pygame.transform.scale(BLOCK_SPRITESHEET.image_at((SCALE * block.block_type, 0, SCALE, SCALE)),
-                                         (SCALE, SCALE), ) for block in self.blocks]
-
-        rects = [image.get_rect() for image in images]
-        for idx, rect in enumerate(rects):
-            rect.x = self.blocks[idx].x
-            rect.y = self.blocks[idx].y
-
-        self.rect = rects[0].copy()
-        for rect in rects[1:]:
-            self.rect.union_ip(rect)
-
-        # Create a new transparent image with the combined size.
-        self.image = pygame.Surface(self.rect.size, pygame.SRCALPHA)
-        # Now blit all sprites onto the new surface.
-        for idx, image in enumerate(images):
-            self.image.blit(image, (rects[idx].x - self.rect.left,
-                                    rects[idx].y - self.rect.top))
-        self.mask = pygame.mask.from_surface(self.image)
-    #this will move the sprite in velocity pixels
-    def move(self, velocity):
-        self.rect.move_ip(velocity)
-        try:
-            self.chunk.end_sprite.move(velocity)
-        except:
-            pass
+        self.image, self.mask, rect = BlockSprite.BAKE_CACHE.get(self.chunk.template, SCALE)
+        self.rect = rect.move(self.chunk.x, 0)
+        # the blocks never move so the chunk keeps its world position
+        # and only the rect on screen follows the camera
+        self.world_x = self.rect.x
+    #this will place the sprite on screen given the camera position in pixels
+    def place(self, camera_x):
+        self.rect.x = self.world_x - camera_x
+        if self.chunk.end_sprite:
+            self.chunk.end_sprite.place(camera_x)
 
     def remove(self):
         self.kill()
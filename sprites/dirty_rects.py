@@ -0,0 +1,78 @@
+import os
+
+import pygame
+
+#render modes
+#flip - the whole screen is pushed to the display every frame
+#dirty - only the parts of the screen that can be seen (waves, player and timer) this frame or the last one are pushed
+FLIP = "flip"
+DIRTY = "dirty"
+RENDER_MODE = os.environ.get("WAVEBORN_RENDER", FLIP)
+
+
+#merges the rects that overlap into their union until none of them overlap
+#so no pixel is pushed twice and the sum of the areas is the area pushed
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        idx = rect.collidelist(merged)
+        while idx != -1:
+            rect.union_ip(merged.pop(idx))
+            idx = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+#pushes the screen to the display
+#everything outside the holes of the visibility mask is black so in dirty mode only the rects drawn on the mask
+#(and the ones of the last frame, to cover them again) are pushed with display.update
+#when they cover more than full_threshold of the screen the whole screen is flipped instead
+#fraction is the part of the screen pushed in the last frame and mean_fraction the mean since the game started
+class DirtyRects:
+    def __init__(self, size, mode=RENDER_MODE, full_threshold=0.5):
+        self.mode = mode
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.full_threshold = full_threshold
+        self.last_rects = None
+        self.fraction = 1.0
+        self.frames = 0
+        self.fraction_sum = 0.0
+
+    #the rects drawn each frame are only needed in dirty mode
+    @property
+    def tracking(self):
+        return self.mode == DIRTY
+
+    @property
+    def mean_fraction(self):
+        return self.fraction_sum / self.frames if self.frames else 0.0
+
+    #the whole screen changed (menus, new game) so the next update pushes all of it
+    def invalidate(self):
+        self.last_rects = None
+
+    #pushes the frame, rects are the rects drawn on the mask this frame
+    def update(self, rects=()):
+        if not self.tracking or self.last_rects is None:
+            self._flip()
+        else:
+            screen_area = self.screen_rect.width * self.screen_rect.height
+            dirty = merge_rects(rect.clip(self.screen_rect) for rect in list(rects) + self.last_rects
+                                if rect.colliderect(self.screen_rect))
+            fraction = sum(rect.width * rect.height for rect in dirty) / screen_area
+            if fraction > self.full_threshold:
+                self._flip()
+            else:
+                pygame.display.update(dirty)
+                self.fraction = fraction
+        self.last_rects = [pygame.Rect(rect) for rect in rects]
+        self.frames += 1
+        self.fraction_sum += self.fraction
+
+    def _flip(self):
+        pygame.display.flip()
+        self.fraction = 1.0
+
+    def report(self):
+        return f"{self.frames} frames, {self.mean_fraction:.1%} of the screen updated per frame"
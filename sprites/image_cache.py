@@ -0,0 +1,113 @@
+import hashlib
+import os
+import struct
+import sys
+from os.path import basename, exists, isdir, join
+
+import pygame
+
+#the image cache keeps the images of the Assets cache on disk already cut, scaled and flipped
+#so a new process loads them as raw pixels instead of decoding the png files and scaling them again
+#there is one file per image, named after the source file and a hash of its key and of the mtime of the source,
+#the key has the scale of the image (which comes from SCALE and the window size) so a different SCALE
+#or window size or a changed png file never uses an old image
+#layout (little endian):
+# header - magic, version, width, height, per pixel alpha, has colorkey, colorkey (rgba)
+# pixels - width * height RGBA (per pixel alpha) or RGB bytes
+IMAGE_MAGIC = b"WBIM"
+IMAGE_VERSION = 1
+HEADER = struct.Struct("<4sHHH??4B")
+IMAGE_CACHE_DIR = os.environ.get("WAVEBORN_IMAGE_CACHE", "./sources/baked")
+
+
+class ImageCache:
+    def __init__(self, directory=IMAGE_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.writes = 0
+
+    #the file of an image key (path, rect, scale, colorkey, alpha, flip), None if the source doesn't exist
+    def file_path(self, key):
+        source = key[0]
+        if not exists(source):
+            return None
+        digest = hashlib.sha1(repr((key, os.stat(source).st_mtime_ns)).encode()).hexdigest()[:20]
+        return join(self.directory, f"{basename(source)}_{digest}.img")
+
+    #loads the image of a key, None if it isn't cached
+    def load(self, key):
+        file_path = self.file_path(key)
+        if file_path is None or not exists(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            data = f.read()
+        magic, version, width, height, alpha, has_colorkey, *colorkey = HEADER.unpack_from(data, 0)
+        if magic != IMAGE_MAGIC or version != IMAGE_VERSION:
+            return None
+        pixels = data[HEADER.size:]
+        if alpha:
+            image = pygame.image.frombuffer(pixels, (width, height), "RGBA").convert_alpha()
+        else:
+            image = pygame.image.frombuffer(pixels, (width, height), "RGB").convert()
+        if has_colorkey:
+            image.set_colorkey(colorkey, pygame.RLEACCEL)
+        self.hits += 1
+        return image
+
+    #writes the image of a key (to a temporary file first so a half written image is never read)
+    def save(self, key, image):
+        file_path = self.file_path(key)
+        if file_path is None:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        alpha = bool(image.get_flags() & pygame.SRCALPHA)
+        colorkey = image.get_colorkey()
+        header = HEADER.pack(IMAGE_MAGIC, IMAGE_VERSION, image.get_width(), image.get_height(), alpha,
+                             colorkey is not None, *(colorkey or (0, 0, 0, 0)))
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as outfile:
+            outfile.write(header)
+            outfile.write(pygame.image.tobytes(image, "RGBA" if alpha else "RGB"))
+        os.replace(tmp_path, file_path)
+        self.writes += 1
+        return file_path
+
+    #removes every cached image
+    def clear(self):
+        if not isdir(self.directory):
+            return
+        for f in os.listdir(self.directory):
+            if f.endswith(".img") or f.endswith(".tmp"):
+                os.remove(join(self.directory, f))
+
+    #bakes every image a game of this window size and SCALE uses
+    #it plays the start of a game so every sprite loads its images through the Assets cache
+    @staticmethod
+    def bake(width, height, scale, directory=IMAGE_CACHE_DIR):
+        from models.game import Game
+        from sprites.assets import Assets
+        from sprites.chunk_sprites import BlockSprite
+
+        cache = ImageCache(directory)
+        cache.clear()
+        assets = Assets.get_or_create()
+        assets.clear()
+        assets.disk = cache
+        Game(width, height, scale).reset(0, 0)
+        #the blocks of the chunks that weren't loaded
+        for block_type in range(assets.sheet("sources/imgs/blocks.png").sheet.get_width() // scale):
+            BlockSprite.BAKE_CACHE.block_image(block_type, scale)
+        return cache
+
+
+#bake step: python -m sprites.image_cache [width height scale]
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    size = [int(arg) for arg in sys.argv[1:4]] if len(sys.argv) > 3 else [1024, 640, 32]
+    pygame.init()
+    pygame.display.set_mode(size[:2])
+    baked = ImageCache.bake(*size)
+    total = sum(os.path.getsize(join(baked.directory, f)) for f in os.listdir(baked.directory))
+    print(f"{baked.writes} images ({total / 2 ** 20:.1f} MB) baked to {baked.directory}")
+    pygame.quit()
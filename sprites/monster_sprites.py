@@ -1,14 +1,18 @@
 import random
-import time
+import struct
 
+import numpy as np
 import pygame
 from pygame.sprite import Sprite
 
-from models.monsters import Feather, SpiderLike, TurtleLike
-from models.sound import Sound
+from models.monster_pool import MonsterPool, NO_TIME
+from models.monsters import Feather, Spawner, SpiderLike, TurtleLike
+from models.sound import Sound, SoundBank, CREATURE, WHALE
+from models.timestep import GameClock
 from models.wave import Wave, Waves
+from models.world import World
 from sprites.player_sprite import PlayerSprite
-from sprites.spritesheet import SpriteSheet
+from sprites.assets import Assets
 
 from sprites.utils import load_images, invert_images
 
@@ -33,6 +37,7 @@ class MonsterSprite(pygame.sprite.Sprite):
         self.pos_update_per_frames = pos_update_per_frames  # update monsters' state per given frames
         self.image_update_count = 0
         self.pos_update_count = 0
+        self.ground_contacts = False  # if the monsters need to know when they are on the ground
 
     def change_monster_state(self, monster):
         # reset image index to 0
@@ -78,11 +83,13 @@ class MonsterSprite(pygame.sprite.Sprite):
         return next_image
 
     def _remove_monster(self, monster):
-        # remove a monster from the world
+        # remove a monster from the world, the spawner reuses it for the next monster of its type
         self.monsters.remove(monster)
         id = monster.id
         if id in self.img_indexes:
             self.img_indexes.pop(id)
+        self.rects.pop(id, None)
+        Spawner.get_or_create().recycle(monster)
 
     def _add_monster(self, monster):
         # add a monster to the world
@@ -93,24 +100,30 @@ class MonsterSprite(pygame.sprite.Sprite):
     def update(self, **kwargs):
         # call update method of each monster
         if self.pos_update_count >= self.pos_update_per_frames:
+            # ask for the block contacts of every monster in a single query
+            alive = [monster for monster in self.monsters if not monster.dying]
+            contacts = World.get_or_create().collision.query(
+                [(self.rects[m.id][1], self.mask, m.direction, m.offset) for m in alive],
+                ground=self.ground_contacts, ceiling=False)
+            contacts = {monster.id: c for monster, c in zip(alive, contacts)}
+
             for monster in self.monsters:
                 self.image, self.rect = self.rects[monster.id]
                 if not monster.dying:
+                    monster.set_contacts(contacts.get(monster.id))
                     monster.update(**kwargs, sprite=self)
+                    monster.set_contacts(None)
 
             self.pos_update_count = 0
         else:
             self.pos_update_count += 1
 
-    def draw(self, mask):
-        # draw monsters
+    def animate(self):
+        # pick the image of each monster for this tick
+        # called once per tick after update so the animation doesn't depend on how often the screen is drawn
         self.image_update_count += 1
         for monster in self.monsters:
             image = self._next_image(monster)
-            mask.blit(
-                image,
-                (monster.x, monster.y),
-            )
             rect = image.get_rect()
             rect.x = monster.x
             rect.y = monster.y
@@ -118,6 +131,34 @@ class MonsterSprite(pygame.sprite.Sprite):
         if self.image_update_count >= self.image_update_per_frames:
             self.image_update_count = 0
 
+    def draw(self, mask, alpha=1.0):
+        # draw monsters with the images picked in animate (their rects are already interpolated)
+        for monster in self.monsters:
+            image, rect = self.rects[monster.id]
+            mask.blit(image, rect)
+
+    def draw_rects(self):
+        # (key, rect) of every monster drawn, used to interpolate them between ticks
+        return [((self, monster.id), self.rects[monster.id][1]) for monster in self.monsters]
+
+    def collide_player(self, player):
+        # the player kills the monsters it falls on and dies when it touches any other one
+        # returns True if the player died
+        for monster in self.monsters:
+            if not monster.dying and player.stepped_on(self.rects[monster.id][1]):
+                self.change_monster_state(monster)
+                monster.dead()
+                player._start_jump(stepped=True)
+            elif not monster.dying and player.has_collision_with(self.rects[monster.id][1]):
+                player.dead()
+                return True
+        return False
+
+    def state_bytes(self):
+        # the state of the monsters hashed by Game.state_hash
+        return b"".join(struct.pack("<ddb??", monster.x, monster.y, monster.direction, monster.dying,
+                                    monster.attacking) for monster in self.monsters)
+
 
 class FeatherSprite(pygame.sprite.Sprite):
     __feather_sprite = None
@@ -127,12 +168,12 @@ class FeatherSprite(pygame.sprite.Sprite):
         self.feathers = {}
         self.WIDTH = WIDTH
         self.HEIGHT = HEIGHT
-        self.left_image = pygame.image.load("sources/imgs/feather.png").convert_alpha()
-        self.left_image = pygame.transform.scale(self.left_image, (SCALE, SCALE))
-        self.right_image = pygame.transform.flip(self.left_image, True, False)
+        self.left_image = Assets.get_or_create().image("sources/imgs/feather.png", (SCALE, SCALE))
+        self.right_image = Assets.get_or_create().flipped(self.left_image)
 
         self.image = self.left_image
         self.rect = self.image.get_rect()
+        self.mask = pygame.mask.from_surface(self.image)
         self.rects = {f.id: self.rect for f in self.feathers}
         FeatherSprite.__feather_sprite = self
 
@@ -156,12 +197,6 @@ class FeatherSprite(pygame.sprite.Sprite):
 
     def draw(self, mask):
         # draw the feathers
-        self.mask = pygame.mask.from_surface(self.image)
-        monster_maskSurf = self.mask.to_surface()
-        monster_maskSurf.set_colorkey((0, 0, 0, 0))
-        olist = self.mask.outline()
-        pygame.draw.polygon(monster_maskSurf, (0, 0, 255), olist, 0)
-
         for feather in self.feathers.values():
             mask.blit(
                 self._get_image(feather.direction),
@@ -225,6 +260,7 @@ class BirdLikeSprite(MonsterSprite):
         self.cry_count = {}
         self.cry_interval = 6
         self.cry_sound_path = 'sources/sounds/bird.mp3'
+        SoundBank.get_or_create().preload(self.cry_sound_path)
         self.SCALE = SCALE
         self.feather_sprite = FeatherSprite.get_or_create(WIDTH=WIDTH, HEIGHT=HEIGHT, SCALE=SCALE)
 
@@ -236,7 +272,7 @@ class BirdLikeSprite(MonsterSprite):
         BirdLikeSprite._singleton = self
 
     def _init_images(self):
-        BIRD_SPRITESHEET = SpriteSheet("sources/imgs/bird.png")
+        BIRD_SPRITESHEET = "sources/imgs/bird.png"
         self.right_move_images = [(i, 0) for i in range(9)]
         self.right_move_images = load_images(BIRD_SPRITESHEET, self.sprite_width, self.sprite_height,
                                              (self.SCALE * 2, self.SCALE * 2),
@@ -255,9 +291,7 @@ class BirdLikeSprite(MonsterSprite):
 
         # stop its crying
         if bird.id in self.cry_count:
-            cry_sound = self.cry_count[bird.id]['sound']
-            cry_sound.stop()
-            Sound.pop_sound(cry_sound)
+            self.cry_count[bird.id]['sound'].stop()
             self.cry_count.pop(bird.id)
 
     def _add_monster(self, bird):
@@ -279,7 +313,7 @@ class BirdLikeSprite(MonsterSprite):
                                                     Feather(bird.get_center(self.sprite_width, self.sprite_height),
                                                             bird.direction))
 
-            finished_crying = bird.id in self.cry_count and time.time() - self.cry_count[bird.id][
+            finished_crying = bird.id in self.cry_count and GameClock.now() - self.cry_count[bird.id][
                 'time'] >= self.cry_interval
 
             if finished_crying or bird.id not in self.cry_count:
@@ -287,10 +321,10 @@ class BirdLikeSprite(MonsterSprite):
                     if bird.id not in self.cry_count:
                         # first time
                         self.cry_count[bird.id] = {'sound': Sound(self.cry_sound_path),
-                                                   'time': time.time(),
+                                                   'time': GameClock.now(),
                                                    'finished': 0,
                                                    'wait': random.randint(1, self.cry_interval)}
-                        self.cry_count[bird.id]['sound'].play()
+                        self.cry_count[bird.id]['sound'].play((bird.x, bird.y))
 
                         wave = Wave([bird.x, bird.y], random.randint(5, 10), 144,
                                     [0, self.cry_count[bird.id]['wait'] / 10])
@@ -301,20 +335,20 @@ class BirdLikeSprite(MonsterSprite):
                         if bird_cry['finished'] == 0:
                             # just finished crying
                             # has to wait for random seconds
-                            bird_cry['finished'] = time.time()
-                        elif time.time() - bird_cry['finished'] >= bird_cry['wait']:
+                            bird_cry['finished'] = GameClock.now()
+                        elif GameClock.now() - bird_cry['finished'] >= bird_cry['wait']:
                             # finished waiting for random seconds
                             # set finished to 0 and cry again
                             wave = Wave([bird.x, bird.y], random.randint(5, 10), 144,
                                         [0, bird_cry['wait'] / 10])
                             Waves.get_or_create().add_wave(wave)
-                            bird_cry['time'] = time.time()
-                            bird_cry['sound'].play()
+                            bird_cry['time'] = GameClock.now()
+                            bird_cry['sound'].play((bird.x, bird.y))
                             bird_cry['finished'] = 0
 
         self.feather_sprite.update()
 
-    def draw(self, mask):
+    def draw(self, mask, alpha=1.0):
         super(BirdLikeSprite, self).draw(mask)
         self.feather_sprite.draw(mask)
 
@@ -326,6 +360,10 @@ class BirdLikeSprite(MonsterSprite):
 
 class GroundMonsterSprite(MonsterSprite):
     # class that display all GroundMonster
+    def __init__(self, image_update_per_frames=0, pos_update_per_frames=0):
+        MonsterSprite.__init__(self, image_update_per_frames, pos_update_per_frames)
+        self.ground_contacts = True
+
     def update(self, **kwargs):
         super(GroundMonsterSprite, self).update(**kwargs)
         for monster in self.monsters:
@@ -340,7 +378,7 @@ class GroundMonsterSprite(MonsterSprite):
 
 class SpiderLikeSprite(GroundMonsterSprite):
     def __init__(self, spiders, WIDTH, HEIGHT, SCALE):
-        MonsterSprite.__init__(self, 32, 10)
+        GroundMonsterSprite.__init__(self, 32, 10)
 
         self.monsters = spiders
         self.cry_interval = 10
@@ -357,7 +395,7 @@ class SpiderLikeSprite(GroundMonsterSprite):
         SpiderLikeSprite._singleton = self
 
     def _init_images(self):
-        SPIDER_SPRITESHEET = SpriteSheet("sources/imgs/spider.png")
+        SPIDER_SPRITESHEET = "sources/imgs/spider.png"
         self.sprite_width = 128
         self.sprite_height = 124
 
@@ -401,7 +439,7 @@ class SpiderLikeSprite(GroundMonsterSprite):
 
 class TurtleLikeSprite(GroundMonsterSprite):
     def __init__(self, turtles, WIDTH, HEIGHT, SCALE):
-        MonsterSprite.__init__(self, 25, 10)
+        GroundMonsterSprite.__init__(self, 25, 10)
 
         self.monsters: list[TurtleLike] = turtles
         self.SCALE = SCALE
@@ -411,6 +449,7 @@ class TurtleLikeSprite(GroundMonsterSprite):
         self.cry_interval = 6
         self.cry_sound_path = 'sources/sounds/turtle.mp3'
         self.step_sound_path = 'sources/sounds/step.mp3'
+        SoundBank.get_or_create().preload(self.cry_sound_path, self.step_sound_path)
         self._init_images()
         self.image = pygame.Surface(self.left_move_images[0].get_size())
         self.rect = self.image.get_rect()
@@ -419,7 +458,7 @@ class TurtleLikeSprite(GroundMonsterSprite):
         TurtleLikeSprite._singleton = self
 
     def _init_images(self):
-        TURTLE_SPRITESHEET = SpriteSheet("sources/imgs/tortoise.png")
+        TURTLE_SPRITESHEET = "sources/imgs/tortoise.png"
         self.sprite_width = 33
         self.sprite_height = 42
 
@@ -445,12 +484,8 @@ class TurtleLikeSprite(GroundMonsterSprite):
     def _remove_monster(self, turtle):
         super(TurtleLikeSprite, self)._remove_monster(turtle)
         if turtle.id in self.sound_count:
-            step_sound = self.sound_count[turtle.id]['step']
-            step_sound.stop()
-            Sound.pop_sound(step_sound)
-            cry_sound = self.sound_count[turtle.id]['cry']
-            cry_sound.stop()
-            Sound.pop_sound(cry_sound)
+            self.sound_count[turtle.id]['step'].stop()
+            self.sound_count[turtle.id]['cry'].stop()
             self.sound_count.pop(turtle.id)
 
     def _add_monster(self, turtle):
@@ -473,14 +508,14 @@ class TurtleLikeSprite(GroundMonsterSprite):
                                                'finished': 0,
                                                "wait": random.randint(1, self.cry_interval)}
 
-            finished_crying = time.time() - self.sound_count[turtle.id]['time'] >= self.cry_interval
+            finished_crying = GameClock.now() - self.sound_count[turtle.id]['time'] >= self.cry_interval
 
             if not turtle.dying and not turtle.attacking:
                 if turtle.want_cry():
                     if self.sound_count[turtle.id]['time'] == 1 << 31:
                         # first time
-                        self.sound_count[turtle.id]['time'] = time.time()
-                        self.sound_count[turtle.id]['cry'].play()
+                        self.sound_count[turtle.id]['time'] = GameClock.now()
+                        self.sound_count[turtle.id]['cry'].play((turtle.x, turtle.y))
                         Waves.get_or_create().add_wave(Wave([turtle.x, turtle.y], random.randint(1, 5), 144,
                                                             [0, self.sound_count[turtle.id]['wait'] / 5]))
                     elif finished_crying:
@@ -488,12 +523,12 @@ class TurtleLikeSprite(GroundMonsterSprite):
                         if turtle_cry['finished'] == 0:
                             # just finished crying
                             # has to wait for random seconds
-                            turtle_cry['finished'] = time.time()
-                        elif time.time() - turtle_cry['finished'] >= turtle_cry['wait']:
+                            turtle_cry['finished'] = GameClock.now()
+                        elif GameClock.now() - turtle_cry['finished'] >= turtle_cry['wait']:
                             # finished waiting for random seconds
                             # set finished to 0 and cry again
-                            turtle_cry['time'] = time.time()
-                            turtle_cry['cry'].play()
+                            turtle_cry['time'] = GameClock.now()
+                            turtle_cry['cry'].play((turtle.x, turtle.y))
                             Waves.get_or_create().add_wave(Wave([turtle.x, turtle.y], random.randint(1, 5), 144,
                                                                 [0, turtle_cry['wait'] / 5]))
                             turtle_cry['finished'] = 0
@@ -515,6 +550,7 @@ class WhaleSprite(MonsterSprite):
         self.attack_count = {}
         self.attack_interval = 5  # 10s
         self.cry_sound_path = "sources/sounds/whale.mp3"
+        SoundBank.get_or_create().preload(self.cry_sound_path)
         self.SCALE = SCALE
         self._init_images()
         self.image = pygame.Surface(self.left_move_images[0].get_size())
@@ -524,7 +560,7 @@ class WhaleSprite(MonsterSprite):
         WhaleSprite._singleton = self
 
     def _init_images(self):
-        WHALE_SPRITESHEET = SpriteSheet("sources/imgs/whale.png")
+        WHALE_SPRITESHEET = "sources/imgs/whale.png"
         SPRITE_WIDTH = 133
         SPRITE_HEIGHT = 44
 
@@ -551,18 +587,233 @@ class WhaleSprite(MonsterSprite):
 
             attack_count = self.attack_count[whale.id]
             if whale.attacking and not attack_count['during_attack']:
-                attack_count['sound'].play()
+                attack_count['sound'].play((whale.x, whale.y))
                 attack_count['during_attack'] = True
             elif not whale.attacking:
                 attack_count['during_attack'] = False
 
+    def _remove_monster(self, whale):
+        super(WhaleSprite, self)._remove_monster(whale)
+        if whale.id in self.attack_count:
+            self.attack_count[whale.id]['sound'].stop()
+            self.attack_count.pop(whale.id)
+
     def _add_monster(self, whale):
         super(WhaleSprite, self)._add_monster(whale)
         id = whale.id
         self.rects[id] = (self.image, self.image.get_rect())
         self.img_indexes[id] = 0
-        self.attack_count[id] = {'sound': Sound(self.cry_sound_path), 'during_attack': False}
+        self.attack_count[id] = {'sound': Sound(self.cry_sound_path, WHALE), 'during_attack': False}
 
     def update_camera_movement(self, movement):
         for whale in self.monsters:
             whale.x -= movement
+
+
+class MonsterPoolSprite(MonsterSprite):
+    # updates and draws a MonsterPool (thousands of monsters of one type in arrays, see models.monster_pool)
+    # with the images, sounds and timings of the sprite of that type (template)
+    # used by the stress mode of Game instead of the template, it keeps what the template does for each monster:
+    # the feathers and cries of the birds, the cries of the turtles and the attack sound of the whales
+
+    def __init__(self, prototype, template):
+        MonsterSprite.__init__(self, template.image_update_per_frames, template.pos_update_per_frames)
+        self.template = template
+        self.ground_contacts = template.ground_contacts
+        self.image = template.image
+        self.rect = template.rect
+        self.pool = MonsterPool(prototype, template.image.get_size())
+
+        # every image of the template in one list, the image of a monster is offsets[image set] + its index
+        # image sets: move, attack and dead images (left and right), the whales don't have dead images
+        dead_images = getattr(template, "left_dead_images", template.left_move_images), \
+                      getattr(template, "right_dead_images", template.right_move_images)
+        image_sets = [template.left_move_images, template.right_move_images,
+                      template.left_attack_images, template.right_attack_images, *dead_images]
+        self.frames = [image for images in image_sets for image in images]
+        self.lengths = np.array([len(images) for images in image_sets])
+        self.offsets = np.cumsum(self.lengths) - self.lengths
+        self.frame_ids = np.zeros(0, np.int64)
+
+        self.birds = isinstance(template, BirdLikeSprite)
+        self.turtles = isinstance(template, TurtleLikeSprite)
+        self.whales = isinstance(template, WhaleSprite)
+        self.sound_path = getattr(template, "cry_sound_path", None)
+        self.sound_priority = WHALE if self.whales else CREATURE
+        self.cry_interval = getattr(template, "cry_interval", 0)
+        self.feather_sprite = template.feather_sprite if self.birds else None
+
+    def __len__(self):
+        return len(self.pool)
+
+    def spawn(self, count):
+        # adds up to count monsters, returns how many were added
+        pool = self.pool
+        new = pool.spawn(count)
+        if self.birds or self.turtles:
+            pool.wait[new] = pool.rng.integers(1, self.cry_interval + 1, new.stop - new.start)
+        if self.turtles:
+            pool.cry_time[new] = NO_TIME
+        return new.stop - new.start
+
+    def update(self, **kwargs):
+        pool = self.pool
+        if self.pos_update_count >= self.pos_update_per_frames:
+            pool.update(PlayerSprite.get_or_create(), World.get_or_create().collision)
+            self.pos_update_count = 0
+        else:
+            self.pos_update_count += 1
+
+        n = pool.size
+        if self.ground_contacts:
+            # GroundMonsterSprite.update: the dying ones die at the last dead image, the attacks start again
+            alive = ~pool.is_dead[:n]
+            dying = alive & pool.dying[:n]
+            pool.is_dead[:n][dying & (pool.img_index[:n] == len(self.template.left_dead_images) - 1)] = True
+            attack_done = alive & ~pool.dying[:n] & pool.attacking[:n] & \
+                          (pool.img_index[:n] == len(self.template.left_attack_images) - 1)
+            pool.img_index[:n][attack_done] = 0
+
+        dead = pool.is_dead[:n].copy()
+        if dead.any():
+            for sound in pool.sound[:n][dead]:
+                if sound:
+                    sound.stop()
+            pool.remove(dead)
+
+        if self.birds:
+            self._launch_feathers()
+            self._bird_cries()
+            self.feather_sprite.update()
+        elif self.turtles:
+            self._turtle_cries()
+        elif self.whales:
+            n = pool.size
+            for idx in np.flatnonzero(pool.attacking[:n] & ~pool.during_attack[:n]):
+                self._play(idx)
+            pool.during_attack[:n] = pool.attacking[:n]
+
+    def _play(self, idx):
+        # plays the sound of a monster (its handle is made the first time)
+        pool = self.pool
+        if pool.sound[idx] is None:
+            pool.sound[idx] = Sound(self.sound_path, self.sound_priority)
+        pool.sound[idx].play((pool.x[idx], pool.y[idx]))
+
+    def _launch_feathers(self):
+        # BirdLikeSprite.update: every attacking bird throws a feather if its last one is gone
+        pool = self.pool
+        template = self.template
+        for idx in np.flatnonzero(pool.attacking[:pool.size]):
+            bird_id = int(pool.ids[idx])
+            if not self.feather_sprite.feather_flying(bird_id):
+                x, y, direction = pool.x[idx], pool.y[idx], int(pool.direction[idx])
+                center_x = x + template.sprite_width // 2 if direction == 1 else x
+                self.feather_sprite.add_feather(bird_id, Feather((center_x, y + template.sprite_height // 2),
+                                                                 direction))
+
+    def _bird_cries(self):
+        # BirdLikeSprite.update: a bird cries now and then, waiting a random time after each cry
+        pool = self.pool
+        n = pool.size
+        now = GameClock.now()
+        cried = ~np.isnan(pool.cry_time[:n])
+        finished = cried & (now - np.nan_to_num(pool.cry_time[:n]) >= self.cry_interval)
+        want = (finished | ~cried) & pool.roll(self.pool.prototype.cry_prob)
+        again = want & cried
+        waiting = again & (pool.cry_finished[:n] == 0)
+        pool.cry_finished[:n][waiting] = now
+        waited = again & ~waiting & (now - pool.cry_finished[:n] >= pool.wait[:n])
+        for idx in np.flatnonzero((want & ~cried) | waited):
+            Waves.get_or_create().add_wave(Wave([pool.x[idx], pool.y[idx]], random.randint(5, 10), 144,
+                                                [0, pool.wait[idx] / 10]))
+            pool.cry_time[idx] = now
+            pool.cry_finished[idx] = 0
+            self._play(idx)
+
+    def _turtle_cries(self):
+        # TurtleLikeSprite.update: a turtle that is walking cries now and then, waiting a random time after each cry
+        pool = self.pool
+        n = pool.size
+        now = GameClock.now()
+        want = ~pool.dying[:n] & ~pool.attacking[:n] & pool.roll(self.pool.prototype.cry_prob)
+        first = want & (pool.cry_time[:n] == NO_TIME)
+        again = want & ~first & (now - pool.cry_time[:n] >= self.cry_interval)
+        waiting = again & (pool.cry_finished[:n] == 0)
+        pool.cry_finished[:n][waiting] = now
+        waited = again & ~waiting & (now - pool.cry_finished[:n] >= pool.wait[:n])
+        for idx in np.flatnonzero(first | waited):
+            pool.cry_time[idx] = now
+            pool.cry_finished[idx] = 0
+            self._play(idx)
+            Waves.get_or_create().add_wave(Wave([pool.x[idx], pool.y[idx]], random.randint(1, 5), 144,
+                                                [0, pool.wait[idx] / 5]))
+
+    def animate(self):
+        # picks the image of every monster (MonsterSprite._next_image) and moves the rects to the monsters
+        pool = self.pool
+        n = pool.size
+        self.image_update_count += 1
+        image_sets = np.where(pool.dying[:n], 2, np.where(pool.attacking[:n], 1, 0)) * 2 + (pool.direction[:n] == 1)
+        lengths = self.lengths[image_sets]
+        index = pool.img_index[:n] % lengths
+        self.frame_ids = self.offsets[image_sets] + index
+        if self.image_update_count >= self.image_update_per_frames:
+            pool.img_index[:n] = (index + 1) % lengths
+            self.image_update_count = 0
+
+        # the rects of the last tick, to interpolate the drawing
+        shown = pool.shown[:n]
+        pool.prev_x[:n] = np.where(shown, pool.rect_x[:n], np.nan)
+        pool.prev_y[:n] = np.where(shown, pool.rect_y[:n], np.nan)
+        shown[:] = True
+        pool.rect_x[:n] = pool.x[:n]
+        pool.rect_y[:n] = pool.y[:n]
+
+    def draw(self, mask, alpha=1.0):
+        # draws the monsters between their last rect (alpha 0) and the current one (alpha 1)
+        pool = self.pool
+        n = min(pool.size, len(self.frame_ids))
+        x = pool.rect_x[:n]
+        y = pool.rect_y[:n]
+        if alpha < 1.0:
+            prev_x = pool.prev_x[:n]
+            prev_y = pool.prev_y[:n]
+            moved = ~np.isnan(prev_x)
+            x = np.where(moved, np.round(prev_x + alpha * (x - prev_x)), x)
+            y = np.where(moved, np.round(prev_y + alpha * (y - prev_y)), y)
+        frames = self.frames
+        mask.blits([(frames[frame], (left, top)) for frame, left, top in
+                    zip(self.frame_ids[:n].tolist(), x.tolist(), y.tolist())], doreturn=False)
+        if self.birds:
+            self.feather_sprite.draw(mask)
+
+    def draw_rects(self):
+        # the pool interpolates its monsters itself in draw
+        return []
+
+    def collide_player(self, player):
+        # MonsterSprite.collide_player for the monsters whose rect collides with the player
+        pool = self.pool
+        for idx in np.flatnonzero(~pool.dying[:pool.size] & pool.colliding(player.rect)):
+            rect = pygame.Rect(int(pool.rect_x[idx]), int(pool.rect_y[idx]), pool.width, pool.height)
+            if player.stepped_on(rect):
+                pool.img_index[idx] = 0
+                if self.ground_contacts:
+                    pool.dying[idx] = True
+                    pool.attacking[idx] = False
+                else:
+                    pool.is_dead[idx] = True
+                player._start_jump(stepped=True)
+            elif player.has_collision_with(rect):
+                player.dead()
+                return True
+        return False
+
+    def state_bytes(self):
+        return self.pool.state_bytes()
+
+    def update_camera_movement(self, movement):
+        self.pool.shift(movement)
+        if self.birds:
+            self.feather_sprite.update_camera_movement(movement)
@@ -5,10 +5,9 @@ import pygame
 from pygame.sprite import Sprite
 
 from models.common import Directions
-from models.sound import Sound
+from models.sound import Sound, PLAYER
 from models.world import World
-from sprites.spritesheet import SpriteSheet
-from sprites.utils import load_images
+from sprites.utils import load_images, SilhouetteCache
 
 from models.wave import Wave, Waves
 
@@ -21,7 +20,7 @@ class PlayerSprite(pygame.sprite.Sprite):
     def __init__(self, height, player, enemies, SCALE):
         Sprite.__init__(self)
 
-        PLAYER_SPRITESHEET = SpriteSheet("sources/imgs/player.png")
+        PLAYER_SPRITESHEET = "sources/imgs/player.png"
         SPRITE_WIDTH = 80
         SPRITE_HEIGHT = 72
 
@@ -30,9 +29,9 @@ class PlayerSprite(pygame.sprite.Sprite):
         self.player = player
         self.SCALE = SCALE
 
-        self.land_sound = Sound("sources/sounds/land.mp3")
-        self.jump_sound = Sound("sources/sounds/jump.mp3")
-        self.running_sound = Sound("sources/sounds/running.mp3")
+        self.land_sound = Sound("sources/sounds/land.mp3", PLAYER)
+        self.jump_sound = Sound("sources/sounds/jump.mp3", PLAYER)
+        self.running_sound = Sound("sources/sounds/running.mp3", PLAYER)
 
         self.stop_image = load_images(PLAYER_SPRITESHEET, SPRITE_WIDTH, SPRITE_HEIGHT, (SCALE, SCALE), [(0, 0)])[0]
 
@@ -46,6 +45,9 @@ class PlayerSprite(pygame.sprite.Sprite):
                                              self.right_move_images)
         self.right_move_images.append(0)  # index of the current image
 
+        # the silhouettes drawn on the visibility mask (the last item of the move images is an index)
+        self.silhouettes = SilhouetteCache([self.stop_image] + self.left_move_images + self.right_move_images)
+
         self.jump_count = 0  # number of UP actions done for a jump
         self.jump_limit = 60  # max number of UP actions per each jump
         self.jumping = False  # is jumping
@@ -76,39 +78,13 @@ class PlayerSprite(pygame.sprite.Sprite):
             return True
 
     def step_on_block(self):
-        blocks = World.get_or_create().get_blocks()
-        sprite = PlayerSprite.get_or_create()
-        for b in blocks:
-            self.rect.y += 5
-            if pygame.sprite.collide_mask(b, sprite):
-                self.rect.x -= 5 * self.direction
-                self.rect.y -= 5
-                if pygame.sprite.collide_mask(b, sprite):
-                    self.rect.x += 5 * self.direction
-                    continue
-                self.rect.x += 5 * self.direction
-                return True
-            self.rect.y -= 5
+        return World.get_or_create().collision.ground_under(self, self.direction)
 
     def collision_with_wall(self):
-        blocks = World.get_or_create().get_blocks()
-        sprite = PlayerSprite.get_or_create()
-        for b in blocks:
-            self.rect.x += 5 * self.direction
-            if pygame.sprite.collide_mask(b, sprite):
-                self.rect.x -= 5 * self.direction
-                return True
-            self.rect.x -= 5 * self.direction
+        return World.get_or_create().collision.wall_ahead(self, 5 * self.direction)
 
     def block_above_player(self):
-        blocks = World.get_or_create().get_blocks()
-        sprite = PlayerSprite.get_or_create()
-        for b in blocks:
-            self.rect.y -= 5
-            if pygame.sprite.collide_mask(b, sprite):
-                self.rect.y += 5
-                return True
-            self.rect.y += 5
+        return World.get_or_create().collision.ceiling_above(self)
 
     @property
     def pos(self):
@@ -136,12 +112,8 @@ class PlayerSprite(pygame.sprite.Sprite):
         return PlayerSprite(**kwargs)
 
     def draw(self, mask):
-        self.mask = pygame.mask.from_surface(self.image)
-        player_maskSurf = self.mask.to_surface()
-        player_maskSurf.set_colorkey((0, 0, 0, 0))
-        olist = self.mask.outline()
-        pygame.draw.polygon(player_maskSurf, (0, 0, 255), olist, 0)
-        mask.blit(player_maskSurf, (self.rect.x, self.rect.y))
+        self.mask, player_maskSurf = self.silhouettes.get(self.image)
+        return mask.blit(player_maskSurf, (self.rect.x, self.rect.y))
 
     def _start_jump(self, stepped=False):
         self.jumping = True
@@ -262,6 +234,8 @@ class PlayerSprite(pygame.sprite.Sprite):
             self.dead()
 
         self.player.direction = None
+        # the collision mask follows the image every tick, not only when it is drawn
+        self.mask = self.silhouettes.get(self.image)[0]
 
     def can_jump_again(self):
         if not self.falling and not self.jumping:
@@ -269,15 +243,10 @@ class PlayerSprite(pygame.sprite.Sprite):
 
     def check_collision(self):
         for enemy in self.enemies:
-            enemy_sprite = enemy.get_or_create()
-            for monster in enemy_sprite.monsters:
-                if not monster.dying and self.stepped_on(enemy_sprite.rects[monster.id][1]):
-                    enemy_sprite.change_monster_state(monster)
-                    monster.dead()
-                    self._start_jump(stepped=True)
-                elif not monster.dying and self.has_collision_with(enemy_sprite.rects[monster.id][1]):
-                    self.dead()
-                    return
+            # the enemies are monster sprite classes (their singleton) or monster sprites
+            enemy_sprite = enemy.get_or_create() if isinstance(enemy, type) else enemy
+            if enemy_sprite.collide_player(self):
+                return
 
     def check_end_collision(self):
         end_sprite = World.get_or_create().end_sprite
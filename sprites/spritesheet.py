@@ -16,6 +16,7 @@ import pygame
 class SpriteSheet:
     def __init__(self, filename):
         """Load the sheet."""
+        self.filename = filename
         try:
             self.sheet = pygame.image.load(filename).convert()
         except pygame.error as e:
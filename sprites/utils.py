@@ -1,16 +1,47 @@
 import pygame
 
+from sprites.assets import Assets
 
+
+# the images are cut, scaled and converted once per process (see Assets), this only returns a new list of them
+# spritesheet is the path of the sheet, it is only decoded if the images aren't in the disk cache
 def load_images(spritesheet, sprite_width, sprite_height, scale, positions):
-    return [pygame.transform.scale(
-        spritesheet.image_at(
-            (a * sprite_width, b * sprite_height, sprite_width, sprite_height), -1
-        ).convert_alpha(),
+    return Assets.get_or_create().frames(
+        spritesheet,
+        [(a * sprite_width, b * sprite_height, sprite_width, sprite_height) for a, b in positions],
         scale,
     )
-        for a, b in positions
-    ]
 
 
 def invert_images(images):
-    return [pygame.transform.flip(mi, True, False) for mi in images]
\ No newline at end of file
+    return [Assets.get_or_create().flipped(mi) for mi in images]
+
+
+# the silhouette of an image is the surface drawn on the visibility mask:
+# the outline of the image filled with the mask colorkey, so the image is seen through the mask
+def make_silhouette(image):
+    mask = pygame.mask.from_surface(image)
+    silhouette = mask.to_surface()
+    silhouette.set_colorkey((0, 0, 0, 0))
+    olist = mask.outline()
+    pygame.draw.polygon(silhouette, (0, 0, 255), olist, 0)
+    return mask, silhouette
+
+
+class SilhouetteCache:
+    # cache of (mask, silhouette) keyed by the source image
+    # filled when the sprite loads its images so drawing only has to blit
+
+    def __init__(self, images=()):
+        self.silhouettes = {}
+        self.add(images)
+
+    def add(self, images):
+        for image in images:
+            if isinstance(image, pygame.Surface) and image not in self.silhouettes:
+                self.silhouettes[image] = make_silhouette(image)
+
+    def get(self, image):
+        if image not in self.silhouettes:
+            self.silhouettes[image] = make_silhouette(image)
+        return self.silhouettes[image]